@@ -0,0 +1,13 @@
+"""
+Offline benchmarks, run from the repo root:
+    python -m benchmarks.run            full hot-path suite, writes bench.json
+    python -m benchmarks.bench_count    DanmakuList.count vs the legacy rescan
+    python -m benchmarks.bench_danmaku  Danmaku record memory and attribute access
+    python -m benchmarks.bench_analysis offline sliding top-k, DanmakuList replay vs NumPy
+    python -m benchmarks.bench_import   cold import time per entry point, fails if heavy deps load eagerly
+    python -m benchmarks.bench_tracker  peak RSS of the old.py watchers, Playwright vs MedalTracker
+    python -m benchmarks.bench_segment  old.py text segmentation, legacy vs streaming and cached
+    python -m benchmarks.bench_emoticon emoticon content, JSON blob vs interned emoticon id
+    python -m benchmarks.bench_intern   window memory with and without content/sender interning
+synth.py generates the synthetic websocket traffic they use.
+"""
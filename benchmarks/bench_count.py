@@ -0,0 +1,131 @@
+"""
+DanmakuList.count: full rescan (legacy) vs incremental ContentCounter, and
+what keeping the counts costs on the add() side.
+    python -m benchmarks.bench_count [--sizes 1000 10000 100000] [--top 3] [--adds 60000]
+
+The add() table streams --adds danmaku through a window that stays at each
+size, so every add also expires one. Legacy is the list window from before
+the deque/counter rewrite, which does no counting at add time; the new add()
+moves the content between count buckets in the 'all' and per-type counters.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dulunche.danmaku import Danmaku, DanmakuList
+
+def legacy_count(dmlist, top=0, type='all'):
+    """DanmakuList.count before the incremental counter, kept as the reference"""
+    res = {}
+    for dm in dmlist:
+        if type == 'all' or type == dm.dmtype:
+            k = dm.content
+            if not res.get(k):
+                res[k] = (1, dm)
+            else:
+                res[k] = (res[k][0]+1, dm)
+    res = sorted(res.items(), key=lambda x: x[1][0], reverse=True)
+    if top>0:
+        res = res[:top]
+    return [(it[1][1],it[1][0]) for it in res]
+
+class LegacyDanmakuList():
+    """DanmakuList.add/refresh before the deque window and counters, kept as the reference; clock returns a datetime"""
+    def __init__(self, duration, clock):
+        self.duration = duration
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.dmlist = []
+
+    def refresh(self):
+        t0 = self.clock() - timedelta(seconds=self.duration)
+        while len(self.dmlist) > 0:
+            if self.dmlist[0].stime < t0:
+                with self.lock:
+                    self.dmlist.pop(0)
+            else:
+                break
+
+    def add(self, danmu):
+        self.refresh()
+        with self.lock:
+            self.dmlist.append(danmu)
+
+def make_danmaku(n, seed=0):
+    """n条弹幕，内容服从近似Zipf分布，约10%为表情"""
+    rnd = random.Random(seed)
+    vocab = [f'弹幕{i}' for i in range(max(10, n//10))]
+    weights = [1/(i+1) for i in range(len(vocab))]
+    now = datetime.now()
+    return [Danmaku(
+        dmid=i,
+        dmtype='emoticon' if rnd.random() < 0.1 else 'danmaku',
+        streamer=None,
+        sender=f'user{rnd.randrange(n)}',
+        stime=now,
+        content=content,
+        color='ffffff',
+    ) for i, content in enumerate(rnd.choices(vocab, weights, k=n))]
+
+def make_window(n, seed=0):
+    dl = DanmakuList(duration=3600)
+    for dm in make_danmaku(n, seed):
+        dl.add(dm)
+    return dl
+
+def time_add(size, adds):
+    """(legacy, new) seconds per add() with the window held at size, one message per simulated millisecond"""
+    dms = make_danmaku(size + adds)
+    start = datetime.now()
+    for i, dm in enumerate(dms):
+        dm.stime = start + timedelta(milliseconds=i)
+    res = []
+    for legacy in (True, False):
+        t = [0]
+        if legacy:
+            dl = LegacyDanmakuList(size / 1000, lambda: start + timedelta(milliseconds=t[0]))
+        else:
+            dl = DanmakuList(size / 1000, clock=lambda: t[0] / 1000)
+        for dm in dms[:size]:
+            dl.add(dm)
+            t[0] += 1
+        t0 = time.perf_counter()
+        for dm in dms[size:]:
+            dl.add(dm)
+            t[0] += 1
+        res.append((time.perf_counter() - t0) / adds)
+    return res
+
+def timeit(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--top', type=int, default=3)
+    parser.add_argument('--adds', type=int, default=60000)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'type':>9} {'legacy(ms)':>11} {'new(ms)':>9} {'speedup':>8}")
+    for n in args.sizes:
+        dl = make_window(n)
+        repeat = max(3, 100000 // n)
+        for tp in ['all', 'emoticon']:
+            assert legacy_count(dl.dmlist, args.top, tp) == dl.count(args.top, tp)
+            assert legacy_count(dl.dmlist, 0, tp) == dl.count(0, tp)
+            t_old = timeit(lambda: legacy_count(dl.dmlist, args.top, tp), repeat)
+            t_new = timeit(lambda: dl.count(args.top, tp), repeat*10)
+            print(f'{n:>8} {tp:>9} {t_old*1e3:>11.3f} {t_new*1e3:>9.4f} {t_old/t_new:>7.0f}x')
+
+    print(f"\n{'size':>8} {'add legacy(us)':>15} {'add new(us)':>12} {'ratio':>6}")
+    for n in args.sizes:
+        t_old, t_new = time_add(n, args.adds)
+        print(f'{n:>8} {t_old*1e6:>15.2f} {t_new*1e6:>12.2f} {t_new/t_old:>5.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Danmaku record: legacy dict subclass vs __slots__ class.
+Bytes per buffered message (tracemalloc) and attribute access cost.
+    python -m benchmarks.bench_danmaku [-n 100000]
+"""
+import argparse
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from dulunche.danmaku import Danmaku, DanmakuList
+
+class LegacyDanmaku(dict):
+    """Danmaku before the __slots__ record, kept as the reference"""
+    def __init__(self, dmid, dmtype, streamer, sender, stime, content, color) -> None:
+        super().__init__()
+        self['dmid'] = dmid
+        self['dmtype'] = dmtype
+        self['streamer'] = streamer
+        self['sender'] = sender
+        self['stime'] = stime
+        self['content'] = content
+        self['color'] = color
+
+    def __getattribute__(self, __name: str):
+        try:
+            return super().__getattribute__(__name)
+        except AttributeError:
+            return self[__name]
+
+def make_fields(n):
+    now = datetime.now()
+    return [(i, 'danmaku', None, f'user{i%5000}', now, f'弹幕{i%300}', 'ffffff') for i in range(n)]
+
+def bytes_per_record(cls, fields):
+    """records only: the field values are allocated beforehand and shared"""
+    gc.collect()
+    tracemalloc.start()
+    records = [cls(*f) for f in fields]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / len(fields)
+
+def bytes_per_buffered(cls, fields):
+    """records plus DanmakuList bookkeeping (window deques and counters)"""
+    gc.collect()
+    tracemalloc.start()
+    dl = DanmakuList(duration=3600)
+    for f in fields:
+        dl.add(cls(*f))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del dl
+    return size / len(fields)
+
+def attr_access(cls, number):
+    dm = cls(0, 'danmaku', None, 'user', datetime.now(), 'content', 'ffffff')
+    t = min(timeit.repeat(lambda: (dm.content, dm.dmtype, dm.stime), number=number, repeat=5))
+    return t / number / 3
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100000)
+    args = parser.parse_args()
+
+    fields = make_fields(args.n)
+    print(f"{'':>14} {'record(B)':>10} {'buffered(B)':>12} {'getattr(ns)':>12}")
+    for name, cls in [('LegacyDanmaku', LegacyDanmaku), ('Danmaku', Danmaku)]:
+        rec = bytes_per_record(cls, fields)
+        buf = bytes_per_buffered(cls, fields)
+        acc = attr_access(cls, 200000)
+        print(f'{name:>14} {rec:>10.1f} {buf:>12.1f} {acc*1e9:>12.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Emoticon danmaku content: legacy JSON blob vs interned emoticon id.
+Decode throughput on emoticon-only frames, distinct keys DanmakuList.count
+sees, and bytes held by the contents of a buffered window.
+    python -m benchmarks.bench_emoticon [-n 100000]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synth import Synth
+from dulunche.danmaku import Danmaku, DanmakuList
+from dulunche.dmc import Bilibili
+from dulunche.emoticon import emoticons
+
+def legacy_content(msg):
+    """what parse_packets stored before the registry"""
+    info = msg['raw_data']['info']
+    return json.dumps({'url': info[0][13]['url'], 'desc': info[1]}, ensure_ascii=False)
+
+def interned_content(msg):
+    info = msg['raw_data']['info']
+    return emoticons.intern_info(info[0][13], info[1])
+
+def decode_all(frames):
+    msgs = []
+    for frame in frames:
+        msgs.extend(m for m in Bilibili.decode_msg(frame) if m['msg_type'] == 'emoticon')
+    return msgs
+
+def window(contents):
+    now = datetime.now()
+    dl = DanmakuList(duration=3600, threadsafe=False)
+    for c in contents:
+        dl.add(Danmaku(0, 'emoticon', None, 'user', now, c, 'ffffff'))
+    return dl
+
+def contents_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    contents = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return contents, size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100000)
+    args = parser.parse_args()
+
+    frames = Synth(mix={'emoticon': 1.0}).frames(args.n)
+    t = time.perf_counter()
+    msgs = decode_all(frames)
+    decode = time.perf_counter() - t
+    cost = {}
+    for name, fn in [('legacy', legacy_content), ('interned', interned_content)]:
+        t = time.perf_counter()
+        for m in msgs:
+            fn(m)
+        cost[name] = (time.perf_counter() - t) / len(msgs)
+
+    # both include the list itself (8 bytes per message)
+    _, legacy_bytes = contents_bytes(lambda: [legacy_content(m) for m in msgs])
+    _, interned_bytes = contents_bytes(lambda: [m['content'] for m in msgs])
+
+    print(f'{len(msgs)} emoticon messages, decode {len(msgs)/decode:,.0f} msg/s')
+    print(f"{'':>9} {'content ns/msg':>15} {'content bytes':>14} {'distinct':>9}")
+    for name, contents, size in [('legacy', [legacy_content(m) for m in msgs], legacy_bytes),
+                                 ('interned', [m['content'] for m in msgs], interned_bytes)]:
+        print(f"{name:>9} {cost[name]*1e9:>15.0f} {size:>14,} {len(window(contents).count(top=0)):>9}")
+
+if __name__ == '__main__':
+    main()
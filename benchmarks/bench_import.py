@@ -0,0 +1,71 @@
+"""
+Cold import cost of each entry point, measured with `python -X importtime`
+in a fresh interpreter, plus a check that heavy dependencies stay lazy.
+    python -m benchmarks.bench_import [--repeat 5] [-o import.json] [--compare base.json]
+
+Exits non-zero if an entry point imports something it must not, or (with
+--compare) got slower than the baseline by more than --tolerance.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# entry point -> modules that must not be loaded by importing it
+ENTRY_POINTS = {
+    'dulunche': ['dulunche.auto', 'dulunche.dmc', 'aiohttp', 'requests', 'PIL', 'yaml'],
+    'dulunche.danmaku': ['asyncio', 'aiohttp', 'requests'],
+    'dulunche.dmc': ['aiohttp', 'brotli', 'requests', 'concurrent.futures.process'],
+    'dulunche.record': ['aiohttp', 'requests'],
+    'dulunche.auto': ['aiohttp', 'PIL', 'qrcode', 'yaml', 'sqlite3', 'cProfile', 'tracemalloc'],
+    'dulunche.monitor': ['requests', 'PIL', 'qrcode', 'yaml'],
+    'dulunche.login': ['requests', 'PIL', 'qrcode'],
+    'dulunche.check_env': ['aiohttp', 'requests', 'PIL', 'yaml', 'qrcode', 'brotli'],
+}
+
+def import_time(module):
+    """cumulative microseconds importing `module` took, from -X importtime"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         capture_output=True, text=True, check=True).stderr
+    for line in out.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise RuntimeError(f'{module} not found in -X importtime output')
+
+def leaked(module, forbidden):
+    code = f'import sys, {module}; print(" ".join(m for m in {forbidden!r} if m in sys.modules))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return out.split()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('-o', '--out', help='write results as JSON')
+    parser.add_argument('--compare', help='previous result file to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown ratio with --compare')
+    args = parser.parse_args()
+
+    base = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+    results = {}
+    failed = False
+    print(f"{'module':<20} {'median(ms)':>10} {'base(ms)':>9}  lazy")
+    for module, forbidden in ENTRY_POINTS.items():
+        us = statistics.median(import_time(module) for _ in range(args.repeat))
+        results[module] = us
+        bad = leaked(module, forbidden)
+        slow = module in base and us > base[module] * args.tolerance
+        failed |= bool(bad) or slow
+        old = f'{base[module]/1e3:9.1f}' if module in base else f"{'-':>9}"
+        print(f"{module:<20} {us/1e3:10.1f} {old}  {'imports ' + ', '.join(bad) if bad else 'ok'}{'  SLOWER' if slow else ''}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
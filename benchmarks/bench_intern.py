@@ -0,0 +1,98 @@
+"""
+Window memory with and without the content/sender intern table.
+    python -m benchmarks.bench_intern [--record room.rec] [-n 20000]
+
+Frames are read back from a recording (dulunche.record format) and decoded,
+and the danmaku are kept in a DanmakuList as AutoDuLunChe does. Without
+--record, synthetic recordings are written for a few duplicate ratios:
+a meme burst, a busy room and a mostly unique chat. Bytes include the intern
+table itself.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synth import Synth
+from dulunche.danmaku import Danmaku, DanmakuList
+from dulunche.dmc import Bilibili, PacketDecoder
+from dulunche.intern import strings
+from dulunche.record import FrameRecorder, iter_frames
+
+SCENARIOS = {
+    'burst': {'vocab': 30, 'users': 2000},
+    'busy': {'vocab': 500, 'users': 20000},
+    'unique': {'vocab': 100000, 'users': 200000},
+}
+
+def write_record(path, synth, n):
+    with FrameRecorder(path) as rec:
+        for i, frame in enumerate(synth.frames(n)):
+            rec.write(frame, ts=1700000000+i*0.1)
+
+def load_window(path, limit):
+    """decode the recording into a window of at most limit danmaku, like AutoDuLunChe.consume"""
+    dmlist = DanmakuList(duration=float('inf'), threadsafe=False)
+    decoder = PacketDecoder()
+    for _, data in iter_frames(path, use_mmap=False):
+        for m in Bilibili.decode_msg(data, decoder, Bilibili.danmaku_cmds):
+            if m['msg_type'] in ['danmaku', 'emoticon']:
+                dmlist.add(Danmaku(0, m['msg_type'], None, m['name'], m['time'], m['content'], m['color']))
+                if len(dmlist.dmlist) >= limit:
+                    return dmlist
+    return dmlist
+
+def measure(path, limit, intern_size):
+    """(window, traced bytes, seconds); timed without tracemalloc, which slows allocation down a lot"""
+    strings.clear()
+    strings.resize(intern_size)
+    t = time.perf_counter()
+    load_window(path, limit)
+    elapsed = time.perf_counter() - t
+    strings.clear()
+    gc.collect()
+    tracemalloc.start()
+    dmlist = load_window(path, limit)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dmlist, size, elapsed
+
+def dup_ratio(values):
+    values = list(values)
+    return 1 - len(set(values)) / len(values) if values else 0.0
+
+def report(name, path, limit, intern_size):
+    dmlist, plain, t_plain = measure(path, limit, 0)
+    n = len(dmlist.dmlist)
+    content_dup = dup_ratio(dm.content for dm in dmlist.dmlist)
+    sender_dup = dup_ratio(dm.sender for dm in dmlist.dmlist)
+    del dmlist
+    dmlist, interned, t_interned = measure(path, limit, intern_size)
+    objects = len({id(dm.content) for dm in dmlist.dmlist})
+    del dmlist
+    print(f'{name:>8} {n:>7} {content_dup:>8.0%} {sender_dup:>8.0%} {plain/n:>9.1f} {interned/n:>9.1f}'
+          f' {1-interned/plain:>7.1%} {t_plain/n*1e6:>8.2f} {t_interned/n*1e6:>8.2f} {objects:>8}')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', help='recording made with python -m dulunche.record record')
+    parser.add_argument('-n', type=int, default=20000, help='danmaku kept in the window')
+    parser.add_argument('--intern-size', type=int, default=strings.maxsize)
+    args = parser.parse_args()
+
+    print(f"{'':>8} {'danmaku':>7} {'dup(c)':>8} {'dup(s)':>8} {'B/dm off':>9} {'B/dm on':>9} {'saved':>7}"
+          f" {'us off':>8} {'us on':>8} {'contents':>8}")
+    if args.record:
+        report(os.path.basename(args.record), args.record, args.n, args.intern_size)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, params in SCENARIOS.items():
+            path = os.path.join(tmp, f'{name}.rec')
+            # about 40% of the default mix is danmaku
+            write_record(path, Synth(seed=7, **params), int(args.n / 0.4) + 1000)
+            report(name, path, args.n, args.intern_size)
+
+if __name__ == '__main__':
+    main()
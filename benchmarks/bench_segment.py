@@ -0,0 +1,133 @@
+"""
+old.py text segmentation: legacy readlines() version vs dulunche.segment,
+cold (no cache) and warm (cached), on a synthetic book.
+    python -m benchmarks.bench_segment [--mb 8]
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from dulunche.segment import load_text
+
+def read_text(fpath,mode):
+    """old.py's read_text before the streaming segmenter, kept as the reference"""
+    text = []
+
+    if '独轮车' in mode:
+        with open(fpath,'r',encoding='utf-8') as f:
+            text_list = f.readlines()
+            for t in text_list:
+                t = t.strip()
+                # t = re.sub(r"[\n,，.。～！、;；]",' ',t)
+                if len(t) > 0 and not t.startswith('//'):
+                    text.append(t[:30])
+                if t == '//':
+                    break
+    else:
+        with open(fpath,'r',encoding='utf-8') as f:
+            text_list = f.readlines()
+            for line in text_list:
+                line = line.strip()
+                if line == '//':
+                    break
+                str_list = re.split(r"[,，.。～！、;；]",line)
+                str_list = [s for s in str_list if s and len(s.strip())>0]
+                p = 0
+                while p < len(str_list):
+                    t = str_list[p]
+                    if len(t) < 10:
+                        while p < len(str_list)-1 and len(t+' '+str_list[p+1]) < 25:
+                            t += ' '+str_list[p+1]
+                            p += 1
+                        text.append(t)
+                        p += 1
+                    elif len(t) > 30:
+                        if len(t) < 60:
+                            t0 = t[:len(t)//2]
+                            t1 = t[len(t)//2:]
+                        else:
+                            t0 = t[0:30]
+                            t1 = t[30:60]
+                        text.append(t0)
+                        text.append(t1)
+                        p += 1
+                    else:
+                        text.append(t)
+                        p += 1
+    return text
+
+def get_mode(fpath):
+    """old.py's get_mode, a second full read of the file"""
+    with open(fpath,'r',encoding='utf-8') as f:
+        text_list = f.readlines()
+        sen_max = max([len(x) for x in text_list])
+        if sen_max > 40:
+            mode = '说书'
+        else:
+            mode = '独轮车'
+    return mode
+
+
+def make_book(path, mb, seed=0):
+    """mostly long paragraphs, some short lines, mixed punctuation, a // marker near the end"""
+    rnd = random.Random(seed)
+    chars = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏闰余成岁律吕调阳云腾致雨露结为霜'
+    puncts = '，。、；！,.;～'
+    size = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while size < mb * 2**20:
+            if rnd.random() < 0.1:
+                line = ''.join(rnd.choices(chars, k=rnd.randint(0, 12)))
+            else:
+                line = ''.join(''.join(rnd.choices(chars, k=rnd.randint(1, 70))) + rnd.choice(puncts)
+                               for _ in range(rnd.randint(1, 12)))
+            line = ' ' * rnd.randint(0, 2) + line + '\n'
+            f.write(line)
+            size += len(line.encode('utf-8'))
+        f.write('//\n后面的不会被读到\n')
+
+def run(fn):
+    """time without tracing, then measure peak traced memory in a second call"""
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return res, dt, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=float, default=8)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        book = os.path.join(tmp, 'book.txt')
+        make_book(book, args.mb)
+        cache = os.path.join(tmp, 'cache')
+        for mode in ['说书', '独轮车']:
+            assert read_text(book, mode) == load_text(book, mode, cache_dir=None)[1]
+        def legacy():
+            mode = get_mode(book)
+            return mode, read_text(book, mode)
+        (mode, old), t_old, m_old = run(legacy)
+        (mode2, new), t_cold, m_cold = run(lambda: load_text(book, 'auto', cache_dir=None))
+        load_text(book, 'auto', cache_dir=cache)
+        (mode3, hot), t_hot, m_hot = run(lambda: load_text(book, 'auto', cache_dir=cache))
+        assert mode == mode2 == mode3 and old == new == hot
+        print(f'{args.mb:g} MiB book, mode {mode}, {len(new)} segments (identical)')
+        print(f'legacy          {t_old:7.3f}s  peak {m_old/2**20:7.1f} MiB')
+        print(f'streaming cold  {t_cold:7.3f}s  peak {m_cold/2**20:7.1f} MiB')
+        print(f'streaming warm  {t_hot:7.3f}s  peak {m_hot/2**20:7.1f} MiB')
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Memory of the old.py room watchers: headless Chromium (Playwright) vs
+LiveWatcher + MedalTracker.
+    python -m benchmarks.bench_tracker [--seconds 20] [--fps 10] [--modes api playwright]
+
+Each mode runs in its own process against a local fake server, and the peak
+RSS of the whole process tree is reported, Chromium's helper processes
+included. The fake server serves a tiny live room page, getInfoByUser,
+Room/get_info and a danmaku websocket that sends LIVE after auth and then
+--fps synthetic brotli frames per second, so the api mode runs what old.py
+runs now: a LiveWatcher websocket with its status poll plus a MedalTracker.
+The real live room page is far heavier than the fake one, so the Playwright
+figure is a lower bound. The playwright mode is skipped if Playwright or its
+Chromium build is not installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from struct import Struct
+
+from benchmarks.synth import Synth
+
+HEADER = Struct('!IHHII')
+USER_INFO = {'code': 0, 'message': '0', 'data': {'medal': {'is_weared': True, 'curr_weared': {
+    'medal_name': '粉丝团', 'level': 12, 'intimacy': 1000, 'next_intimacy': 1500}}}}
+ROOM_INFO = {'code': 0, 'data': {'room_id': 1, 'live_status': 1}}
+PAGE = ('<html><body><span class="fans-medal-content">粉丝团</span>'
+        '<span class="fans-medal-level-font">12</span>'
+        '<span class="dp-i-block t-over-hidden t-no-wrap">1000/1500</span></body></html>')
+
+def packet(body, ver=0, op=5):
+    return HEADER.pack(len(body)+16, 16, ver, op, 0) + body
+
+class FakeServer():
+    """aiohttp server on its own thread; counts websocket connections and frames sent"""
+    def __init__(self, fps=10) -> None:
+        self.fps = fps
+        self.connections = 0
+        self.frames = 0
+        self.base = None
+        self.frame_pool = Synth(seed=3).frames(2000, batch=20, ver=3)
+
+    async def user_info(self, request):
+        from aiohttp import web
+        return web.json_response(USER_INFO)
+
+    async def room_info(self, request):
+        from aiohttp import web
+        return web.json_response(ROOM_INFO)
+
+    async def page(self, request):
+        from aiohttp import web
+        return web.Response(text=PAGE, content_type='text/html')
+
+    async def sub(self, request):
+        from aiohttp import web
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.receive()
+        self.connections += 1
+        await ws.send_bytes(packet(b'{"code":0}', 1, 8))
+        await ws.send_bytes(packet(json.dumps({'cmd': 'LIVE', 'roomid': 1}).encode()))
+        # 心跳之类的客户端消息读掉就行
+        reader = asyncio.create_task(self.drain(ws))
+        try:
+            i = 0
+            while not ws.closed:
+                await ws.send_bytes(self.frame_pool[i % len(self.frame_pool)])
+                self.frames += 1
+                i += 1
+                await asyncio.sleep(1 / self.fps)
+        except ConnectionError:
+            pass
+        finally:
+            reader.cancel()
+        return ws
+
+    async def drain(self, ws):
+        async for _ in ws:
+            pass
+
+    async def serve(self, started):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/xlive/web-room/v1/index/getInfoByUser', self.user_info)
+        app.router.add_get('/room/v1/Room/get_info', self.room_info)
+        app.router.add_get('/sub', self.sub)
+        app.router.add_get('/', self.page)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        self.base = f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}'
+        started.set()
+        await asyncio.Event().wait()
+
+    def start(self):
+        started = threading.Event()
+        threading.Thread(target=asyncio.run, args=(self.serve(started),), daemon=True).start()
+        started.wait()
+        return self.base
+
+def run_api(base, seconds):
+    """what old.py runs now: LiveWatcher (websocket + status poll) and MedalTracker on BiliLiveAPI"""
+    import dulunche.live as live
+    from dulunche.biliapi import BiliLiveAPI
+    from dulunche.dmc import Bilibili
+    from dulunche.medal import MedalTracker
+    # room_init/getDanmuInfo走缓存，websocket连本地的假弹幕服务器
+    Bilibili.room_ids['1'] = (1, float('inf'))
+    Bilibili.tokens[1] = ('token', [base.replace('http://', 'ws://') + '/sub'])
+    async def get_live_status(room_id, session):
+        async with session.get(f'{base}/room/v1/Room/get_info', params={'room_id': room_id}) as resp:
+            return (await resp.json(content_type=None))['data']['live_status']
+    live.get_live_status = get_live_status
+    watcher = live.LiveWatcher(1).start()
+    bapi = BiliLiveAPI(cookies={'SESSDATA': 'x', 'bili_jct': 'y'})
+    fetch = lambda: bapi.sessions[0].get(f'{base}/xlive/web-room/v1/index/getInfoByUser', params={'room_id': 1}).json()
+    tracker = MedalTracker(1, fetch, interval=0.5, status=watcher.status).start()
+    time.sleep(seconds)
+    print(json.dumps({'live': watcher.status.live, 'intimacy': tracker.last_value}))
+
+def run_playwright(base, seconds):
+    """what old.py ran before: one headless Chromium polling the DOM"""
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_context().new_page()
+        page.goto(base)
+        end = time.time() + seconds
+        while time.time() < end:
+            page.query_selector('.fans-medal-content').inner_text()
+            page.query_selector('.dp-i-block.t-over-hidden.t-no-wrap').inner_text()
+            time.sleep(0.5)
+        browser.close()
+    print(json.dumps({}))
+
+def tree_rss(pid):
+    """RSS of pid and all its descendants in bytes, from /proc"""
+    children = {}
+    for p in os.listdir('/proc'):
+        if p.isdigit():
+            try:
+                with open(f'/proc/{p}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                children.setdefault(ppid, []).append(int(p))
+            except (OSError, ValueError, IndexError):
+                pass
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        stack.extend(children.get(p, []))
+        try:
+            with open(f'/proc/{p}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            pass
+    return total
+
+def measure(mode, base, seconds):
+    """(peak RSS, what the child reported, error)"""
+    proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_tracker', '--child', mode, base, str(seconds)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    peak = 0
+    while proc.poll() is None:
+        peak = max(peak, tree_rss(proc.pid))
+        time.sleep(0.2)
+    out, err = proc.communicate()
+    if proc.returncode != 0:
+        return None, None, err.strip().splitlines()[-1:]
+    return peak, json.loads(out.strip().splitlines()[-1]), None
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        mode, base, seconds = sys.argv[2], sys.argv[3], float(sys.argv[4])
+        {'api': run_api, 'playwright': run_playwright}[mode](base, seconds)
+        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--fps', type=float, default=10, help='websocket frames per second from the fake server')
+    parser.add_argument('--modes', nargs='+', default=['api', 'playwright'], choices=['api', 'playwright'])
+    args = parser.parse_args()
+
+    server = FakeServer(args.fps)
+    base = server.start()
+    for mode in args.modes:
+        frames = server.frames
+        peak, report, error = measure(mode, base, args.seconds)
+        if peak is None:
+            print(f'{mode:<11} skipped: {error[0] if error else "failed"}')
+            continue
+        line = f'{mode:<11} peak RSS {peak/2**20:8.1f} MiB'
+        if mode == 'api':
+            line += f'  (ws frames {server.frames - frames}, live={report["live"]}, intimacy={report["intimacy"]})'
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Hot-path benchmark suite, runs offline on synthetic traffic.
+    python -m benchmarks.run [--quick] [-o bench.json] [--compare base.json]
+
+Results are written as JSON so runs on different commits can be compared.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.synth import Synth
+from dulunche import AutoDuLunChe
+from dulunche.danmaku import Danmaku, DanmakuList
+from dulunche.dmc import Bilibili
+from dulunche.filters import DanmakuFilter
+
+def best_of(fn, repeat):
+    """fn() -> number of ops it performed; returns best seconds per op"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best
+
+def result(name, params, per_op):
+    return {'name': name, 'params': params, 'per_op_us': per_op*1e6, 'ops_per_s': 1/per_op}
+
+def bench_decode(quick, batches=(1, 20, 100), mix=None):
+    out = []
+    total = 2000 if quick else 20000
+    for ver in [0, 2, 3]:
+        for batch in batches:
+            frames = Synth(mix=mix, seed=ver).frames(total, batch=batch, ver=ver)
+            for cmds in [None, Bilibili.danmaku_cmds]:
+                def run():
+                    for f in frames:
+                        Bilibili.decode_msg(f, None, cmds)
+                    return total
+                per_msg = best_of(run, 3)
+                out.append(result('decode_msg', {'ver': ver, 'batch': batch, 'prefilter': cmds is not None}, per_msg))
+    return out
+
+class FakeClock():
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+def make_danmaku(n, seed=0):
+    synth = Synth(seed=seed)
+    return [Danmaku(i, 'danmaku', None, synth.user()[1], None, c, 'ffffff')
+            for i, c in enumerate(synth.rnd.choices(synth.vocab, synth.vocab_w, k=n))]
+
+def bench_window(quick):
+    out = []
+    ops = 20000 if quick else 100000
+    for duration in [30, 60]:
+        for rate in [10, 100, 1000]:
+            size = duration * rate
+            clock = FakeClock()
+            dl = DanmakuList(duration=duration, clock=clock)
+            dms = make_danmaku(size + ops)
+            step = 1 / rate
+            # steady state: the window already holds duration*rate messages
+            for dm in dms[:size]:
+                clock.t += step
+                dl.add(dm)
+            params = {'duration': duration, 'rate': rate, 'window': size}
+
+            def add():
+                for dm in dms[size:]:
+                    clock.t += step
+                    dl.add(dm)
+                return ops
+            out.append(result('DanmakuList.add', params, best_of(add, 1)))
+
+            def length():
+                for _ in range(1000):
+                    len(dl)
+                return 1000
+            out.append(result('DanmakuList.__len__', params, best_of(length, 3)))
+
+            def count():
+                for _ in range(1000):
+                    dl.count(top=3)
+                return 1000
+            out.append(result('DanmakuList.count', params, best_of(count, 3)))
+    return out
+
+def make_filter(synth, filter_medal):
+    return DanmakuFilter(filter_medal=filter_medal, filter_self=True, uname='用户0', up_medal=synth.up_medal)
+
+def bench_dmavailable(quick):
+    out = []
+    synth = Synth(seed=1)
+    msgs = []
+    for f in synth.frames(2000 if quick else 20000, batch=100, ver=0):
+        msgs.extend(Bilibili.decode_msg(f))
+    dlc = AutoDuLunChe.__new__(AutoDuLunChe)
+    dlc.filter_in_decoder = False
+    for filter_medal in ['medal', 'fans', 'none']:
+        dlc.dmfilter = make_filter(synth, filter_medal)
+        def run():
+            for m in msgs:
+                dlc.dmavailable(m)
+            return len(msgs)
+        out.append(result('AutoDuLunChe.dmavailable', {'filter_medal': filter_medal}, best_of(run, 3)))
+    return out
+
+def bench_filter(quick):
+    """decode + filter per received message: filtering after decode (consume) vs inside the decoder"""
+    out = []
+    total = 2000 if quick else 20000
+    synth = Synth(seed=2)
+    frames = synth.frames(total, batch=20, ver=3)
+    for filter_medal in ['medal', 'fans']:
+        dmfilter = make_filter(synth, filter_medal)
+        def consume():
+            for f in frames:
+                for m in Bilibili.decode_msg(f, None, Bilibili.danmaku_cmds):
+                    if m['msg_type'] in ['danmaku', 'emoticon']:
+                        dmfilter(m['raw_data'])
+            return total
+        def pushdown():
+            rejected = {}
+            for f in frames:
+                Bilibili.decode_msg(f, None, Bilibili.danmaku_cmds, dmfilter, rejected)
+            return total
+        for where, fn in [('consume', consume), ('decoder', pushdown)]:
+            out.append(result('decode+filter', {'filter_medal': filter_medal, 'where': where}, best_of(fn, 5)))
+    return out
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+def key(r):
+    return r['name'], json.dumps(r['params'], sort_keys=True)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true', help='smaller inputs, for a smoke run')
+    parser.add_argument('-o', '--out', default='bench.json')
+    parser.add_argument('--compare', help='previous result file to compare against')
+    parser.add_argument('--only', nargs='+', choices=['decode', 'window', 'dmavailable', 'filter'])
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 20, 100], help='packets per frame for decode')
+    parser.add_argument('--mix', help='message mix for decode, e.g. danmaku=0.5,gift=0.2,interact=0.3')
+    args = parser.parse_args()
+
+    mix = None
+    if args.mix:
+        mix = {k: float(v) for k, v in (it.split('=') for it in args.mix.split(','))}
+    suites = {
+        'decode': lambda quick: bench_decode(quick, args.batches, mix),
+        'window': bench_window,
+        'dmavailable': bench_dmavailable,
+        'filter': bench_filter,
+    }
+    results = []
+    for name, suite in suites.items():
+        if args.only and name not in args.only:
+            continue
+        results.extend(suite(args.quick))
+
+    base = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = {key(r): r for r in json.load(f)['results']}
+    for r in results:
+        line = f"{r['name']:<26} {json.dumps(r['params'], ensure_ascii=False):<52} {r['per_op_us']:>10.3f} us"
+        old = base.get(key(r))
+        if old:
+            line += f"  x{old['per_op_us']/r['per_op_us']:.2f}"
+        print(line)
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'commit': git_commit(),
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'quick': args.quick,
+            },
+            'results': results,
+        }, f, ensure_ascii=False, indent=1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Synthetic Bilibili websocket traffic for offline benchmarks.
+"""
+import json
+import random
+import zlib
+from struct import Struct
+
+import brotli
+
+HEADER = Struct('!IHHII')
+
+DEFAULT_MIX = {
+    'danmaku': 0.35,
+    'emoticon': 0.05,
+    'gift': 0.15,
+    'interact': 0.35,
+    'rank': 0.10,
+}
+
+def packet(body, ver=0, op=5):
+    return HEADER.pack(len(body)+16, 16, ver, op, 0) + body
+
+class Synth():
+    """
+    Deterministic message generator.
+    vocab: number of distinct danmaku contents (Zipf-like popularity)
+    users: number of distinct senders
+    medal_ratio: share of danmaku senders wearing a medal
+    """
+    def __init__(self, mix=None, vocab=200, users=5000, medal_ratio=0.6, up_medal='粉丝团', seed=0) -> None:
+        self.rnd = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.vocab = [f'弹幕内容{i}' for i in range(vocab)]
+        self.vocab_w = [1/(i+1) for i in range(vocab)]
+        self.users = users
+        self.medal_ratio = medal_ratio
+        self.up_medal = up_medal
+        self.ts = 1700000000000
+
+    def user(self):
+        uid = self.rnd.randrange(self.users)
+        return uid, f'用户{uid}'
+
+    def medal(self):
+        if self.rnd.random() >= self.medal_ratio:
+            return []
+        name = self.up_medal if self.rnd.random() < 0.5 else '别家牌子'
+        return [self.rnd.randint(1, 30), name, '主播', 23197314, 6067854, '', 0, 6067854, 6067854, 6067854, 0, 1, 23197314]
+
+    def body(self, kind):
+        self.ts += self.rnd.randint(0, 50)
+        uid, uname = self.user()
+        if kind in ['danmaku', 'emoticon']:
+            content = self.rnd.choices(self.vocab, self.vocab_w)[0]
+            emoticon = '{}'
+            if kind == 'emoticon':
+                content = f'[表情{self.rnd.randrange(20)}]'
+                emoticon = {
+                    'emoticon_unique': f'room_23197314_{self.rnd.randrange(20)}',
+                    'url': f'http://i0.hdslb.com/bfs/live/{self.rnd.randrange(20)}.png',
+                    'width': 120, 'height': 120, 'in_player_area': 1, 'is_dynamic': 0,
+                }
+            info = [
+                [0, 1, 25, 16777215, self.ts, self.rnd.getrandbits(31), 0, 'e5a8f1b0', 0, 0, 0, '', 0, emoticon, '{}', {'mode': 0}],
+                content,
+                [uid, uname, 0, 0, 0, 10000, 1, ''],
+                self.medal(),
+                [self.rnd.randint(0, 60), 0, 9868950, '>50000', 0],
+                ['', ''], 0, 0, None, {'ts': self.ts//1000, 'ct': 'ABCDEF12'}, 0, 0, None, emoticon, 0, 210,
+            ]
+            j = {'cmd': 'DANMU_MSG', 'info': info, 'dm_v2': ''}
+        elif kind == 'gift':
+            j = {'cmd': 'SEND_GIFT', 'data': {
+                'uid': uid, 'uname': uname, 'giftName': '辣条', 'giftId': 1, 'num': self.rnd.randint(1, 99),
+                'price': 100, 'coin_type': 'silver', 'timestamp': self.ts//1000, 'medal_info': {'medal_name': self.up_medal},
+            }}
+        elif kind == 'interact':
+            j = {'cmd': 'INTERACT_WORD', 'data': {
+                'uid': uid, 'uname': uname, 'msg_type': 1, 'roomid': 23197314, 'timestamp': self.ts//1000,
+                'fans_medal': {'medal_name': '', 'medal_level': 0}, 'score': self.ts,
+            }}
+        else:
+            j = {'cmd': 'ONLINE_RANK_COUNT', 'data': {'count': self.rnd.randint(1000, 9999), 'online_count': 12345}}
+        return json.dumps(j, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def bodies(self, n):
+        return [self.body(k) for k in self.rnd.choices(self.kinds, self.weights, k=n)]
+
+    def frame(self, n, ver=3):
+        """one websocket message carrying n op-5 packets"""
+        raw = b''.join(packet(b) for b in self.bodies(n))
+        if ver == 0:
+            return raw
+        if ver == 2:
+            return packet(zlib.compress(raw), ver=2)
+        return packet(brotli.compress(raw), ver=3)
+
+    def frames(self, total, batch=20, ver=3):
+        out = []
+        while total > 0:
+            n = min(batch, total)
+            out.append(self.frame(n, ver))
+            total -= n
+        return out
@@ -0,0 +1,198 @@
+"""
+直播结束后的弹幕离线分析，数据来自录制文件(dulunche.record)或弹幕存档(dulunche.archive)。
+
+弹幕载入成NumPy数组：时间戳、内容id、发送者id（相同的字符串只存一次），
+速率曲线、滑动窗口top-k、突发检测、发送者活跃度都是向量化计算，
+百万条弹幕的场次几秒内就能算完。需要numpy：pip install numpy
+    python -m dulunche.analysis room.rec
+    python -m dulunche.analysis danmaku.db --room 2021185
+"""
+import sqlite3
+import logging
+import numpy as np
+
+from dulunche.dmc import Bilibili, PacketDecoder
+from dulunche.record import MAGIC, iter_frames
+
+__all__ = ["DanmakuSession"]
+
+class DanmakuSession():
+    """
+    ts: float64 unix时间戳，按时间排序
+    content_id/sender_id: int32，分别是contents/senders里的下标，按首次出现的顺序编号
+    """
+    def __init__(self, ts, content_id, sender_id, contents, senders) -> None:
+        order = np.argsort(ts, kind='stable')
+        self.ts = np.asarray(ts, dtype=np.float64)[order]
+        self.content_id = np.asarray(content_id, dtype=np.int32)[order]
+        self.sender_id = np.asarray(sender_id, dtype=np.int32)[order]
+        self.contents = contents
+        self.senders = senders
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: 可迭代的(ts, sender, content)"""
+        contents, senders = {}, {}
+        ts, cids, sids = [], [], []
+        for t, sender, content in rows:
+            ts.append(t)
+            cids.append(contents.setdefault(content, len(contents)))
+            sids.append(senders.setdefault(sender, len(senders)))
+        return cls(ts, cids, sids, list(contents), list(senders))
+
+    @classmethod
+    def from_record(cls, path):
+        """解码录制文件里的弹幕，时间用录制时的帧时间戳"""
+        def rows():
+            decoder = PacketDecoder()
+            for ts, data in iter_frames(path):
+                for m in Bilibili.decode_msg(data, decoder, Bilibili.danmaku_cmds):
+                    if m['msg_type'] in ['danmaku', 'emoticon']:
+                        yield ts, m['name'], m['content']
+        return cls.from_rows(rows())
+
+    @classmethod
+    def from_archive(cls, path, room_id=None, start=0, end=float('inf')):
+        sql = 'SELECT ts, sender, content FROM danmaku WHERE ts >= ? AND ts < ?'
+        args = [start, end]
+        if room_id is not None:
+            sql += ' AND room_id = ?'
+            args.append(int(room_id))
+        conn = sqlite3.connect(path)
+        try:
+            return cls.from_rows(conn.execute(sql, args))
+        finally:
+            conn.close()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """按文件头判断是录制文件还是存档"""
+        with open(path, 'rb') as f:
+            head = f.read(len(MAGIC))
+        if head == MAGIC:
+            return cls.from_record(path)
+        return cls.from_archive(path, **kwargs)
+
+    def bins(self, width):
+        """每条弹幕所在时间桶的下标，和桶的个数"""
+        if not len(self):
+            return np.zeros(0, dtype=np.int64), 0
+        idx = ((self.ts - self.ts[0]) // width).astype(np.int64)
+        return idx, int(idx[-1]) + 1
+
+    def rate_curve(self, width=1.0):
+        """返回(每个桶的开始时间, 条/秒)"""
+        idx, n = self.bins(width)
+        counts = np.bincount(idx, minlength=n)
+        start = self.ts[0] if len(self) else 0.0
+        return start + np.arange(n) * width, counts / width
+
+    def sliding_top(self, window=60, step=10, k=5):
+        """
+        每step秒看一次前window秒内出现最多的k条内容，window需为step的整数倍。
+        返回[(窗口结束时间, [(content, cnt), ...]), ...]，次数相同时先出现的内容在前。
+        """
+        w = max(1, int(round(window / step)))
+        idx, n = self.bins(step)
+        if not n:
+            return []
+        # 每个(桶, 内容)只留一项和它的次数，窗口滑动时整桶加减
+        keys = idx * len(self.contents) + self.content_id
+        keys, cnts = np.unique(keys, return_counts=True)
+        bin_of, cid_of = np.divmod(keys, len(self.contents))
+        bounds = np.searchsorted(bin_of, np.arange(n + 1))
+        counts = np.zeros(len(self.contents), dtype=np.int64)
+        out = []
+        for j in range(n):
+            lo, hi = bounds[j], bounds[j+1]
+            counts[cid_of[lo:hi]] += cnts[lo:hi]
+            if j >= w:
+                lo, hi = bounds[j-w], bounds[j-w+1]
+                counts[cid_of[lo:hi]] -= cnts[lo:hi]
+            kk = min(k, len(counts))
+            top = np.argpartition(-counts, kk - 1)[:kk]
+            top = top[np.lexsort((top, -counts[top]))]
+            out.append((float(self.ts[0] + (j + 1) * step),
+                        [(self.contents[c], int(counts[c])) for c in top if counts[c] > 0]))
+        return out
+
+    def bursts(self, width=1.0, baseline=60, threshold=3.0, min_rate=1.0):
+        """
+        速率比前baseline秒的均值高出threshold个标准差（且不低于min_rate）的时间段。
+        返回[(开始时间, 结束时间, 峰值速率), ...]
+        """
+        start, rate = self.rate_curve(width)
+        b = max(1, int(round(baseline / width)))
+        if len(rate) <= b:
+            return []
+        c1 = np.concatenate(([0.0], np.cumsum(rate)))
+        c2 = np.concatenate(([0.0], np.cumsum(rate * rate)))
+        # 第i个桶的基线是[i-b, i)
+        i = np.arange(b, len(rate))
+        mean = (c1[i] - c1[i-b]) / b
+        std = np.sqrt(np.maximum((c2[i] - c2[i-b]) / b - mean * mean, 0))
+        hot = np.zeros(len(rate), dtype=bool)
+        hot[b:] = (rate[b:] >= min_rate) & (rate[b:] > mean + threshold * np.maximum(std, 1e-9))
+        edges = np.diff(np.concatenate(([0], hot.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return [(float(start[s]), float(start[e-1] + width), float(rate[s:e].max())) for s, e in zip(starts, ends)]
+
+    def sender_activity(self, n=20):
+        """
+        发送最多的n个用户。
+        返回[(sender, 条数, 不同内容数, 首次时间, 最后时间), ...]
+        """
+        if not len(self):
+            return []
+        counts = np.bincount(self.sender_id, minlength=len(self.senders))
+        pairs = np.unique(self.sender_id.astype(np.int64) * len(self.contents) + self.content_id)
+        distinct = np.bincount(pairs // len(self.contents), minlength=len(self.senders))
+        # ts已排序，第一次/最后一次出现的下标就是首末时间
+        first = np.zeros(len(self.senders), dtype=np.int64)
+        last = np.zeros(len(self.senders), dtype=np.int64)
+        sids, idx = np.unique(self.sender_id, return_index=True)
+        first[sids] = idx
+        sids, idx = np.unique(self.sender_id[::-1], return_index=True)
+        last[sids] = len(self) - 1 - idx
+        top = np.argsort(-counts, kind='stable')[:n]
+        return [(self.senders[s], int(counts[s]), int(distinct[s]), float(self.ts[first[s]]), float(self.ts[last[s]])) for s in top]
+
+if __name__ == '__main__':
+    import time
+    import argparse
+    from datetime import datetime
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='录制文件或弹幕存档')
+    parser.add_argument('--room', type=int, help='存档里的房间号')
+    parser.add_argument('-w', '--window', type=float, default=60, help='top-k窗口长度')
+    parser.add_argument('--step', type=float, default=60, help='top-k输出间隔')
+    parser.add_argument('-n', '--top', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s]: %(message)s",
+        datefmt='%Y-%m-%d %H:%M:%S',
+    )
+    def fmt(ts):
+        return datetime.fromtimestamp(ts).strftime('%H:%M:%S')
+
+    t0 = time.perf_counter()
+    kwargs = {'room_id': args.room} if args.room else {}
+    session = DanmakuSession.load(args.path, **kwargs)
+    logging.info(f'载入 {len(session)} 条弹幕，{len(session.contents)} 种内容，{len(session.senders)} 个用户，用时 {time.perf_counter()-t0:.2f}s')
+    if not len(session):
+        raise SystemExit
+    _, rate = session.rate_curve(60)
+    logging.info(f'平均 {len(session)/max(session.ts[-1]-session.ts[0], 1):.2f} 条/秒，分钟峰值 {rate.max():.2f} 条/秒')
+    for start, end, peak in session.bursts():
+        logging.info(f'突发 {fmt(start)}-{fmt(end)} 峰值 {peak:.0f} 条/秒')
+    for end, top in session.sliding_top(args.window, args.step, args.top):
+        logging.info(f'{fmt(end)} ' + ' | '.join(f'{c}×{cnt}' for c, cnt in top))
+    for sender, cnt, distinct, first, last in session.sender_activity():
+        logging.info(f'{sender}: {cnt} 条，{distinct} 种内容，{fmt(first)}-{fmt(last)}')
+    logging.info(f'分析用时 {time.perf_counter()-t0:.2f}s')
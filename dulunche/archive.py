@@ -0,0 +1,153 @@
+"""
+弹幕存档：解码后的弹幕写入SQLite(WAL模式)。
+
+事件循环里只做一次put_nowait，真正的写入在后台线程里按批次executemany，
+磁盘再慢也不会卡住事件循环；队列满了就丢弃并计数。
+"""
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from hashlib import blake2b
+
+__all__ = ["DanmakuArchive"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS danmaku (
+    id INTEGER PRIMARY KEY,
+    room_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    uid INTEGER,
+    sender TEXT,
+    medal_name TEXT,
+    medal_level INTEGER,
+    dmtype TEXT,
+    content TEXT,
+    content_hash INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_danmaku_room_ts ON danmaku(room_id, ts);
+CREATE INDEX IF NOT EXISTS idx_danmaku_ts ON danmaku(ts);
+CREATE INDEX IF NOT EXISTS idx_danmaku_sender ON danmaku(sender);
+CREATE INDEX IF NOT EXISTS idx_danmaku_hash ON danmaku(content_hash);
+"""
+INSERT = 'INSERT INTO danmaku (room_id, ts, uid, sender, medal_name, medal_level, dmtype, content, content_hash) VALUES (?,?,?,?,?,?,?,?,?)'
+
+def content_hash(content):
+    """内容的64位有符号哈希，用于索引和分组"""
+    return int.from_bytes(blake2b(content.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+class DanmakuArchive():
+    def __init__(self, path, batch_size=1000, maxsize=100000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.q = queue.Queue(maxsize)
+        self.written = 0
+        self.dropped = 0
+        self.thread = None
+        with closing(self.connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.writer, name='DanmakuArchive', daemon=True)
+            self.thread.start()
+        return self
+
+    def close(self):
+        """写完队列里剩下的再退出"""
+        if self.thread is not None:
+            self.q.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, room_id, ts, uid, sender, medal_name, medal_level, dmtype, content):
+        try:
+            self.q.put_nowait((room_id, ts, uid, sender, medal_name, medal_level, dmtype, content))
+        except queue.Full:
+            self.dropped += 1
+
+    def add_msg(self, room_id, dm):
+        """存一条Bilibili.decode_msg解出来的弹幕"""
+        info = dm.get('raw_data', {}).get('info')
+        uid = medal_name = medal_level = None
+        if info:
+            uid = info[2][0]
+            if info[3]:
+                medal_level, medal_name = info[3][0], info[3][1]
+        self.add(int(room_id), dm['time'].timestamp(), uid, dm['name'], medal_name, medal_level, dm['msg_type'], dm['content'])
+
+    def writer(self):
+        conn = self.connect()
+        try:
+            stop = False
+            while not stop:
+                batch = [self.q.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.q.get_nowait())
+                    except queue.Empty:
+                        break
+                # None是close()放进来的结束标记
+                stop = batch[-1] is None
+                rows = [row + (content_hash(row[-1]),) for row in batch if row is not None]
+                if not rows:
+                    continue
+                try:
+                    with conn:
+                        conn.executemany(INSERT, rows)
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    self.dropped += len(rows)
+                    logging.error(f'弹幕存档写入失败: {e}')
+        finally:
+            conn.close()
+
+    def history(self, start, end, room_id=None, sender=None, limit=1000):
+        """按时间范围查询弹幕，start/end为unix时间戳"""
+        sql = 'SELECT room_id, ts, uid, sender, medal_name, medal_level, dmtype, content FROM danmaku WHERE ts >= ? AND ts < ?'
+        args = [start, end]
+        if room_id is not None:
+            sql += ' AND room_id = ?'
+            args.append(int(room_id))
+        if sender is not None:
+            sql += ' AND sender = ?'
+            args.append(sender)
+        sql += ' ORDER BY ts LIMIT ?'
+        args.append(limit)
+        with closing(self.connect()) as conn:
+            return conn.execute(sql, args).fetchall()
+
+    def top_content(self, start, end, room_id=None, n=10):
+        """时间范围内出现次数最多的弹幕内容，返回[(content, cnt), ...]"""
+        sql = 'SELECT MIN(content), COUNT(*) AS cnt FROM danmaku WHERE ts >= ? AND ts < ?'
+        args = [start, end]
+        if room_id is not None:
+            sql += ' AND room_id = ?'
+            args.append(int(room_id))
+        sql += ' GROUP BY content_hash ORDER BY cnt DESC LIMIT ?'
+        args.append(n)
+        with closing(self.connect()) as conn:
+            return conn.execute(sql, args).fetchall()
+
+    def count_content(self, content, start=0, end=None):
+        """某条内容在时间范围内出现的次数"""
+        end = time.time() if end is None else end
+        with closing(self.connect()) as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM danmaku WHERE content_hash = ? AND ts >= ? AND ts < ? AND content = ?',
+                (content_hash(content), start, end, content),
+            ).fetchone()[0]
@@ -0,0 +1,275 @@
+import json
+import asyncio
+import random
+import logging
+
+from dulunche.danmaku import Danmaku, DanmakuList
+from dulunche.biliapi import BiliLiveAPI, AsyncBiliLiveAPI
+from dulunche.dmc import DanmakuClient, Bilibili
+from dulunche.ingest import IngestQueue
+from dulunche.metrics import PipelineMetrics
+from dulunche.rate import RateEstimator
+from dulunche.live import LiveStatus, get_live_status
+from dulunche.emoticon import emoticons
+from dulunche.filters import DanmakuFilter
+from dulunche.intern import strings
+
+__all__ = ["AutoDuLunChe"]
+
+class AutoDuLunChe():
+    def __init__(self, 
+                 room_id,
+                 cookies, 
+                 check_length=60, 
+                 min_freq=1,
+                 interval=15,
+                 random_size=3,
+                 filter_medal=True,
+                 filter_self=True,
+                 cmds=None,
+                 **kwargs) -> None:
+        self.room_id = room_id
+        self.check_length = check_length
+        self.min_freq = min_freq
+        if not isinstance(interval, dict):
+            self.interval = {0:float(interval)}
+        else:
+            self.interval = interval
+        self.random_size = random_size
+        self.filter_medal = filter_medal
+        self.filter_self = filter_self
+        self.cmds = frozenset(cmds) if cmds else Bilibili.danmaku_cmds
+        self.kwargs = kwargs
+
+        if isinstance(cookies, str):
+            with open(cookies, encoding='utf8') as f:
+                cookies = json.load(f)
+                cookies = {it['name']:it['value'] for it in cookies['cookie_info']['cookies']}
+        self.cookies = cookies
+        self.bapi = BiliLiveAPI(cookies=self.cookies)
+
+        login_info = self.bapi.get_user_info(self.room_id)
+        if login_info['code'] != 0:
+            input('未登录，请使用biliuprs进行登录：https://github.com/biliup/biliup-rs')
+            exit(1)
+        else:
+            data = login_info['data']
+            self.up_medal = data['medal']['up_medal']['medal_name']
+            self.uname = data['info']['uname']
+            self.uid = data['info'].get('uid')
+            if data['medal']['is_weared']:
+                logging.info(f"正在使用账号 {data['info']['uname']} 独轮车，佩戴 {data['medal']['curr_weared']['medal_name']} {data['medal']['curr_weared']['level']}级 牌子.")
+            else:
+                logging.info(f"正在使用账号 {data['info']['uname']} 独轮车，未戴牌子.")
+        
+        # 过滤条件编译一次，交给解码器在生成消息之前过滤
+        self.dmfilter = DanmakuFilter(
+            filter_medal=self.filter_medal,
+            filter_self=self.filter_self,
+            uname=self.uname,
+            uid=self.uid,
+            up_medal=self.up_medal,
+            types=self.kwargs.get('types', ['danmaku', 'emoticon']),
+            min_medal_level=self.kwargs.get('min_medal_level', 0),
+            allow_uids=self.kwargs.get('allow_uids'),
+            deny_uids=self.kwargs.get('deny_uids'),
+            min_length=self.kwargs.get('min_length', 0),
+            max_length=self.kwargs.get('max_length', 0),
+        )
+        # 存档要收下所有弹幕，这时只能在consume里过滤
+        self.filter_in_decoder = False
+        # 弹幕内容和名字的驻留表，解码器和窗口共用；0表示不驻留
+        strings.resize(self.kwargs.get('intern_size', strings.maxsize))
+        # 所有访问都在同一个事件循环里，不需要锁；
+        # 进程池解码出来的字符串是子进程里驻留的，进窗口前在本进程再驻留一次
+        pooled = self.kwargs.get('decode_workers', 0) > 0 and self.kwargs.get('decode_executor', 'thread') == 'process'
+        self.dmlist = DanmakuList(duration=self.check_length, threadsafe=False, strings=strings if pooled else None)
+        # 发送间隔按哪个窗口的速率算，秒数或ewma，默认和检测时长一致
+        self.rate_view = self.kwargs.get('rate_view', self.check_length)
+        self.rate = RateEstimator(horizon=max(300, self.check_length))
+        self.metrics = PipelineMetrics()
+        self.metrics.bind_window(self.dmlist)
+        self.metrics.bind_rate(self.rate)
+        self.total_cnt = 0
+        self.stoped = True
+        self.loop = None
+        self.task = None
+        self.abapi = None
+        self.live = LiveStatus(self.room_id)
+        self.archive = None
+
+    async def ingest(self, q):
+        """DanmakuClient出错或断开后重新建立，直到stop()"""
+        while not self.stoped:
+            self.dmc = DanmakuClient(
+                url=f'https://live.bilibili.com/{self.room_id}',
+                q=q,
+                cmds=self.cmds,
+                decode_workers=self.kwargs.get('decode_workers', 0),
+                decode_executor=self.kwargs.get('decode_executor', 'thread'),
+                recorder=self.kwargs.get('record'),
+                metrics=self.metrics,
+                session=self.abapi.session,
+                live=self.live,
+                dmfilter=self.dmfilter if self.filter_in_decoder else None,
+            )
+            try:
+                await self.dmc.start()
+            except asyncio.CancelledError:
+                await self.dmc.stop()
+                raise
+            except Exception as e:
+                await self.dmc.stop()
+                logging.error(e)
+                await asyncio.sleep(5)
+
+    async def consume(self, q):
+        lost = 0
+        while not self.stoped:
+            for dm in await q.get_many():
+                if self.archive is not None and dm['msg_type'] in ['danmaku','emoticon']:
+                    for _ in range(dm.get('repeat', 1)):
+                        self.archive.add_msg(self.room_id, dm)
+                reason = self.filter_reason(dm)
+                if reason is not None:
+                    self.metrics.rejected[reason].inc()
+                else:
+                    self.metrics.accepted.inc()
+                    repeat = dm.get('repeat', 1)
+                    dm = Danmaku(
+                        dmid=0,
+                        dmtype=dm['msg_type'],
+                        streamer=None,
+                        sender=dm['name'],
+                        stime=dm['time'],
+                        content=dm['content'],
+                        color=dm['color']
+                    )
+                    for _ in range(repeat):
+                        self.dmlist.add(dm)
+                    self.rate.add(repeat)
+            if q.dropped + q.coalesced - lost >= 100:
+                lost = q.dropped + q.coalesced
+                logging.warning(f'弹幕处理不过来，队列已满，累计丢弃 {q.dropped} 条，合并 {q.coalesced} 条.')
+
+    def dmavailable(self, dm):
+        return self.filter_reason(dm) is None
+
+    def filter_reason(self, dm):
+        """返回弹幕被过滤的原因，可用的弹幕返回None"""
+        if dm['msg_type'] not in ['danmaku','emoticon']:
+            return 'type'
+        if self.filter_in_decoder:
+            # 解码时已经过滤过了
+            return None
+        return self.dmfilter(dm['raw_data'])
+
+    async def run_sender(self):
+        logging.info('正在收集弹幕数据...')
+        await asyncio.sleep(self.check_length)
+
+        while not self.stoped:
+            if self.live.live is False:
+                logging.info('主播未开播，暂停开车.')
+                await self.live.wait_for(True)
+                continue
+            freq = self.rate.get(self.rate_view)
+            if freq < self.min_freq:
+                logging.info(f'弹幕过少，设置频率阈值 {self.min_freq}条/秒，实际发送速率 {freq:.2f}条/秒，暂停开车.')
+                await asyncio.sleep(self.check_length)
+                continue
+            top_danmu = self.dmlist.count(top=self.random_size)
+            if not top_danmu:
+                # 速率视图比检测时长长时，窗口可能已经空了
+                await asyncio.sleep(1)
+                continue
+            dm, _ = random.choice(top_danmu)
+            if dm.dmtype == 'emoticon':
+                # 表情弹幕的content是表情id，日志里显示表情名；房间表情列表过期了顺便刷新
+                await emoticons.load_room(self.room_id, lambda: self.abapi.get_emoticons(self.room_id))
+                text = emoticons.describe(dm.content)
+            else:
+                text = dm.content
+
+            try:
+                rt = await self.abapi.send_danmu(self.room_id, msg=dm.content, emoticon=int(dm.dmtype=='emoticon'))
+                if rt['msg'] == '':
+                    self.total_cnt += 1
+                    logging.info(f'独轮车 {self.total_cnt:04d}: {text} 发送成功.')
+                else:
+                    logging.error(f"独轮车 {text} 发送失败, {rt['msg']}.")
+                    await asyncio.sleep(5)
+                    continue
+            except Exception as e:
+                logging.error(f'独轮车 {text} 发送失败, {e}.')
+                await asyncio.sleep(5)
+                continue
+
+            sleep_time = self.check_length
+            for n, t in self.interval.items():
+                if freq > n:
+                    sleep_time = t
+            await asyncio.sleep(sleep_time)
+
+    async def run(self):
+        """接收、统计、发送都作为任务跑在同一个事件循环上，stop()后协作退出"""
+        self.stoped = False
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        q = IngestQueue(
+            maxsize=self.kwargs.get('queue_size', 10000),
+            policy=self.kwargs.get('queue_policy', 'drop_oldest'),
+            metrics=self.metrics,
+        )
+        self.metrics.bind_queue(q)
+        # 发弹幕和弹幕连接共用一个带连接池的会话
+        self.abapi = AsyncBiliLiveAPI(cookies=self.cookies)
+        if self.kwargs.get('archive'):
+            from dulunche.archive import DanmakuArchive
+            self.archive = DanmakuArchive(self.kwargs['archive']).start()
+        self.filter_in_decoder = self.archive is None and not self.dmfilter.noop
+        tasks = [
+            asyncio.create_task(self.ingest(q)),
+            asyncio.create_task(self.consume(q)),
+            asyncio.create_task(self.run_sender()),
+            # 开播下播主要靠弹幕连接里的LIVE/PREPARING，HTTP查询只作低频兜底
+            asyncio.create_task(self.live.poll(
+                lambda: get_live_status(self.room_id, self.abapi.session),
+                self.kwargs.get('live_poll_interval', 300))),
+        ]
+        if self.kwargs.get('profiling'):
+            from dulunche.profiling import Profiler
+            profiler = Profiler(self.kwargs.get('profile_dir', 'profile'), stages=[
+                ('decode', Bilibili, 'decode_msg'),
+                ('parse', Bilibili, 'parse_packets'),
+                ('filter', self, 'filter_reason'),
+                ('predicate', DanmakuFilter, '__call__'),
+                ('window', self.dmlist, 'add'),
+            ])
+            profiler.install(self.loop)
+        if self.kwargs.get('metrics_port'):
+            tasks.append(asyncio.create_task(self.metrics.serve(self.kwargs['metrics_port'])))
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.stoped = True
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.archive is not None:
+                self.archive.close()
+                self.archive = None
+            await self.abapi.close()
+            self.abapi = None
+            logging.info('独轮车已停止.')
+
+    def start(self):
+        asyncio.run(self.run())
+
+    def stop(self):
+        """可以在任意线程调用"""
+        self.stoped = True
+        if self.task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.task.cancel)
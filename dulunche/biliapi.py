@@ -3,9 +3,17 @@
 import json
 import re
 import time
+from http.cookiejar import DefaultCookiePolicy
 from typing import List, Union
 import requests
-import http.cookiejar as cookielib
+
+def parse_cookie(cookie:str):
+    """从cookie字符串中取出buvid3,SESSDATA,bili_jct，缺少的项为空字符串"""
+    cookie = re.sub(r"\s+", "", cookie)
+    mo1 = re.search(r"buvid3=([^;]+)", cookie)
+    mo2 = re.search(r"SESSDATA=([^;]+)", cookie)
+    mo3 = re.search(r"bili_jct=([^;]+)", cookie)
+    return mo1.group(1) if mo1 else "",mo2.group(1) if mo2 else "",mo3.group(1) if mo3 else ""
 
 class BaseAPI:
     headers = {
@@ -13,6 +21,10 @@ class BaseAPI:
     }
     def __init__(self,timeout=(3.05,5)):
         self.timeout=timeout
+        # 不带cookie的请求共用一个会话，复用keep-alive连接，不用每次重新握手
+        self.session=requests.session()
+        # 不保存响应的Set-Cookie（比如getLoginInfo返回的SESSDATA），否则之后的匿名请求都会带上
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
         
     
     def set_default_timeout(self,timeout=(3.05,5)):
@@ -44,7 +56,7 @@ class BiliLiveAPI(BaseAPI):
         url="https://api.live.bilibili.com/xlive/web-room/v1/index/getInfoByRoom"
         params={"room_id":roomid}
         if timeout is None: timeout=self.timeout
-        res=requests.get(url=url,headers=self.headers,params=params,timeout=timeout)
+        res=self.session.get(url=url,headers=self.headers,params=params,timeout=timeout)
         return json.loads(res.text)
 
     def get_danmu_config(self,roomid,number=0,timeout=None) -> dict:
@@ -63,6 +75,14 @@ class BiliLiveAPI(BaseAPI):
         res=self.sessions[number].get(url=url,headers=self.headers,params=params,timeout=timeout)
         return json.loads(res.text)
     
+    def get_emoticons(self,roomid,number=0,timeout=None) -> dict:
+        """获取用户在直播间内可用的表情包，表情ID为emoticon_unique"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v2/emoticon/GetEmoticons"
+        params={"platform":"pc","room_id":roomid}
+        if timeout is None: timeout=self.timeout
+        res=self.sessions[number].get(url=url,headers=self.headers,params=params,timeout=timeout)
+        return json.loads(res.text)
+    
     def set_danmu_config(self,roomid,color=None,mode=None,number=0,timeout=None) -> dict:
         """设置用户在直播间内的弹幕颜色或弹幕位置
         :（颜色参数为十六进制字符串，颜色和位置不能同时设置）"""
@@ -181,14 +201,14 @@ class BiliLiveAPI(BaseAPI):
             "page_size": page_size,
         }
         if timeout is None: timeout=self.timeout
-        res=requests.get(url=url,headers=self.headers,params=params,timeout=timeout)
+        res=self.session.get(url=url,headers=self.headers,params=params,timeout=timeout)
         return json.loads(res.text)
     
     def get_login_url(self,timeout=None):
         """获取登录链接"""
         url="https://passport.bilibili.com/qrcode/getLoginUrl"
         if timeout is None: timeout=self.timeout
-        res=requests.get(url=url,headers=self.headers,timeout=timeout)
+        res=self.session.get(url=url,headers=self.headers,timeout=timeout)
         return json.loads(res.text)
     
     def get_login_info(self,oauthKey,timeout=None):
@@ -198,22 +218,153 @@ class BiliLiveAPI(BaseAPI):
             "oauthKey": oauthKey,
         }
         if timeout is None: timeout=self.timeout
-        res=requests.post(url=url,headers=self.headers,data=data,timeout=timeout)
+        res=self.session.post(url=url,headers=self.headers,data=data,timeout=timeout)
         return json.loads(res.text)
     
     def update_cookie(self,cookie:str,number=0) -> str:
         """更新账号Cookie信息
         :返回cookie中buvid3,SESSDATA,bili_jct三项的合并内容"""
-        cookie = re.sub(r"\s+", "", cookie)
-        mo1 = re.search(r"buvid3=([^;]+)", cookie)
-        mo2 = re.search(r"SESSDATA=([^;]+)", cookie)
-        mo3 = re.search(r"bili_jct=([^;]+)", cookie)
-        buvid3,sessdata,bili_jct=mo1.group(1) if mo1 else "",mo2.group(1) if mo2 else "",mo3.group(1) if mo3 else ""
+        buvid3,sessdata,bili_jct=parse_cookie(cookie)
         cookie="buvid3=%s;SESSDATA=%s;bili_jct=%s"%(buvid3,sessdata,bili_jct)
         requests.utils.add_dict_to_cookiejar(self.sessions[number].cookies,{"Cookie": cookie})
         self.csrfs[number]=bili_jct
         return cookie
 
+class AsyncBiliLiveAPI(BaseAPI):
+    def __init__(self,cookies:Union[List[str],str,dict],timeout=(3.05,5),session=None,limit=32,limit_per_host=8):
+        """BiliLiveAPI的异步版本，可与DanmakuClient跑在同一个事件循环、共用同一个aiohttp会话
+        :session为共享的aiohttp.ClientSession，由调用方负责关闭，多账号时应使用cookie_jar=aiohttp.DummyCookieJar()；
+        不传则自建一个带连接池、不保存cookie的会话，
+        :limit/limit_per_host为自建连接池的总连接数和单个域名的并发上限"""
+        import aiohttp
+        self.timeout=timeout
+        self.headers = dict(self.headers,
+            Origin="https://live.bilibili.com",
+            Referer="https://live.bilibili.com/")
+        self.own_session = session is None
+        if session is None:
+            connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, keepalive_timeout=60)
+            # 响应的Set-Cookie不保存，否则会被带到其他账号的请求里
+            session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        self.session = session
+        # cookie按请求传，每个请求只带这个账号自己的
+        self.cookies = []
+        self.csrfs = []
+        self.rnd=int(time.time())
+        if isinstance(cookies,str):    cookies=[cookies]
+        if isinstance(cookies,list):
+            for cookie in cookies:
+                buvid3,sessdata,bili_jct=parse_cookie(cookie)
+                self.cookies.append({"buvid3":buvid3,"SESSDATA":sessdata,"bili_jct":bili_jct})
+                self.csrfs.append(bili_jct)
+        if isinstance(cookies,dict):
+            self.cookies.append(dict(cookies))
+            self.csrfs.append(cookies.get('bili_jct'))
+
+    async def close(self):
+        if self.own_session:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self,method,url,number=None,params=None,data=None,timeout=None) -> dict:
+        """number为None时不带cookie"""
+        import aiohttp
+        if timeout is None: timeout=self.timeout
+        cookies = None if number is None else self.cookies[number]
+        async with self.session.request(method,url,headers=self.headers,params=params,data=data,cookies=cookies,
+                                        timeout=aiohttp.ClientTimeout(sock_connect=timeout[0],sock_read=timeout[1])) as res:
+            return json.loads(await res.text())
+
+    def csrf_data(self,number,**data) -> dict:
+        data["csrf_token"]=self.csrfs[number]
+        data["csrf"]=self.csrfs[number]
+        return data
+
+    async def get_room_info(self,roomid,timeout=None) -> dict:
+        """获取直播间标题、简介等信息"""
+        url="https://api.live.bilibili.com/xlive/web-room/v1/index/getInfoByRoom"
+        return await self.request("GET",url,params={"room_id":roomid},timeout=timeout)
+
+    async def get_danmu_config(self,roomid,number=0,timeout=None) -> dict:
+        """获取用户在直播间内的可用弹幕颜色、弹幕位置等信息"""
+        url="https://api.live.bilibili.com/xlive/web-room/v1/dM/GetDMConfigByGroup"
+        return await self.request("GET",url,number,params={"room_id":roomid},timeout=timeout)
+
+    async def get_user_info(self,roomid,number=0,timeout=None) -> dict:
+        """获取用户在直播间内的当前弹幕颜色、弹幕位置、发言字数限制等信息"""
+        url="https://api.live.bilibili.com/xlive/web-room/v1/index/getInfoByUser"
+        return await self.request("GET",url,number,params={"room_id":roomid},timeout=timeout)
+
+    async def get_emoticons(self,roomid,number=0,timeout=None) -> dict:
+        """获取用户在直播间内可用的表情包，表情ID为emoticon_unique"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v2/emoticon/GetEmoticons"
+        return await self.request("GET",url,number,params={"platform":"pc","room_id":roomid},timeout=timeout)
+
+    async def set_danmu_config(self,roomid,color=None,mode=None,number=0,timeout=None) -> dict:
+        """设置用户在直播间内的弹幕颜色或弹幕位置
+        :（颜色参数为十六进制字符串，颜色和位置不能同时设置）"""
+        url="https://api.live.bilibili.com/xlive/web-room/v1/dM/AjaxSetConfig"
+        data=self.csrf_data(number,room_id=roomid)
+        # aiohttp不接受值为None的表单项
+        if color is not None: data["color"]=color
+        if mode is not None: data["mode"]=mode
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def send_danmu(self,roomid,msg,mode=1,number=0,timeout=None,emoticon=0) -> dict:
+        """向直播间发送弹幕"""
+        url="https://api.live.bilibili.com/msg/send"
+        data=self.csrf_data(number,color=16777215,fontsize=25,mode=mode,bubble=0,dm_type=emoticon,msg=msg,roomid=roomid,rnd=self.rnd)
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def get_slient_user_list(self,roomid,number=0,timeout=None):
+        """获取房间被禁言用户列表"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v1/banned/GetSilentUserList"
+        return await self.request("GET",url,number,params={"room_id":roomid,"ps":1},timeout=timeout)
+
+    async def add_slient_user(self,roomid,uid,number=0,timeout=None):
+        """禁言用户"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v1/banned/AddSilentUser"
+        data=self.csrf_data(number,room_id=roomid,tuid=uid,mobile_app="web")
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def del_slient_user(self,roomid,silent_id,number=0,timeout=None):
+        """解除用户禁言"""
+        url="https://api.live.bilibili.com/banned_service/v1/Silent/del_room_block_user"
+        data=self.csrf_data(number,roomid=roomid,id=silent_id)
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def get_shield_keyword_list(self,roomid,number=0,timeout=None):
+        """获取房间屏蔽词列表"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v1/banned/GetShieldKeywordList"
+        return await self.request("GET",url,number,params={"room_id":roomid,"ps":2},timeout=timeout)
+
+    async def add_shield_keyword(self,roomid,keyword,number=0,timeout=None):
+        """添加房间屏蔽词"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v1/banned/AddShieldKeyword"
+        data=self.csrf_data(number,room_id=roomid,keyword=keyword)
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def del_shield_keyword(self,roomid,keyword,number=0,timeout=None):
+        """删除房间屏蔽词"""
+        url="https://api.live.bilibili.com/xlive/web-ucenter/v1/banned/DelShieldKeyword"
+        data=self.csrf_data(number,room_id=roomid,keyword=keyword)
+        return await self.request("POST",url,number,data=data,timeout=timeout)
+
+    async def search_live_users(self,keyword,page_size=10,timeout=None) -> dict:
+        """根据关键字搜索直播用户"""
+        url="https://api.bilibili.com/x/web-interface/search/type"
+        params={
+            "keyword": keyword,
+            "search_type": "live_user",
+            "page_size": page_size,
+        }
+        return await self.request("GET",url,params=params,timeout=timeout)
+
 class JsdelivrAPI(BaseAPI):
     def __init__(self, timeout=(6.05,5)):
         """Jsdelivr公共CDN的API"""
@@ -223,7 +374,7 @@ class JsdelivrAPI(BaseAPI):
         """获取最新的B站直播屏蔽词处理脚本（Github项目：FHChen0420/bili_live_shield_words）"""
         url=f"https://{domain}.jsdelivr.net/gh/FHChen0420/bili_live_shield_words@main/BiliLiveShieldWords.py"
         if timeout is None: timeout=self.timeout
-        res=requests.get(url,headers=self.headers,timeout=timeout)
+        res=self.session.get(url,headers=self.headers,timeout=timeout)
         return res.text
 
 if __name__ == '__main__':
@@ -1,11 +1,25 @@
+"""
+检查运行环境，缺少依赖时提示自动安装：
+    python -m dulunche.check_env
+只查找模块是否存在，不导入，调用开销很小。
+"""
 import os
-try:
-    import yaml
-    import PIL
-    import requests
-    import aiohttp
-    import qrcode
-except ImportError:
-    input('Python环境未正确安装，回车自动安装：')
-    os.system("python -m pip install -r requirements.txt -i https://pypi.tuna.tsinghua.edu.cn/simple")
-    print('Python环境安装完成.')
\ No newline at end of file
+import sys
+from importlib.util import find_spec
+
+REQUIRED = ['yaml', 'PIL', 'requests', 'aiohttp', 'brotli', 'qrcode']
+
+def missing():
+    return [name for name in REQUIRED if find_spec(name) is None]
+
+def check():
+    lost = missing()
+    if lost:
+        input(f'Python环境未正确安装(缺少{", ".join(lost)})，回车自动安装：')
+        os.system(f"{sys.executable} -m pip install -r requirements.txt -i https://pypi.tuna.tsinghua.edu.cn/simple")
+        print('Python环境安装完成.')
+    return not lost
+
+if __name__ == '__main__':
+    if check():
+        print('Python环境已正确安装.')
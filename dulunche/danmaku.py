@@ -1,7 +1,17 @@
+import time
+import heapq
 import threading
-from datetime import datetime, timedelta
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+class Danmaku():
+    """
+    用__slots__存字段的弹幕记录，比dict省内存。
+    按原来dict用法写的代码仍然可用：dm['content']、dict(dm)、to_dict()。
+    """
+    __slots__ = ('dmid', 'dmtype', 'streamer', 'sender', 'stime', 'content', 'color')
 
-class Danmaku(dict):
     def __init__(
         self,
         dmid:int,
@@ -12,63 +22,191 @@ class Danmaku(dict):
         content:str,
         color:str
     ) -> None:
-        super().__init__()
-        self['dmid'] = dmid
-        self['dmtype'] = dmtype
-        self['streamer'] = streamer
-        self['sender'] = sender
-        self['stime'] = stime
-        self['content'] = content
-        self['color'] = color
-
-    def __getattribute__(self, __name: str):
-        try:
-            return super().__getattribute__(__name)
-        except AttributeError:
-            return self[__name]
-        
+        self.dmid = dmid
+        self.dmtype = dmtype
+        self.streamer = streamer
+        self.sender = sender
+        self.stime = stime
+        self.content = content
+        self.color = color
+
+    def keys(self):
+        return self.__slots__
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f'Danmaku({self.to_dict()!r})'
+
+class ContentCounter():
+    """
+    随窗口增量维护的内容计数，弹幕先进先出。
+    按次数分桶：buckets[c]是出现c次的内容(dict当有序集合用)，加入和过期都只是把内容挪到相邻的桶，O(1)。
+    非空的桶用higher/lower串成双向链表，刷屏时最多的内容能有上万次，查询时不用扫过中间的空桶。
+    排名是次数多的在前，次数相同时按在窗口里第一次出现的先后，和原来每次重建dict再稳定排序的结果完全一致；
+    同一个桶里的先后在查询时才排，top(n)只排用到的桶。
+    """
+    def __init__(self) -> None:
+        # 内容 -> deque[(seq, Danmaku)]，seq是加入窗口的序号
+        self.items = {}
+        # 下标0是链表的哨兵
+        self.buckets = [None]
+        self.higher = [0]
+        self.lower = [0]
+        self.max = 0
+
+    def link(self, c, below):
+        """把刚变成非空的桶c接到below上面"""
+        above = self.higher[below]
+        self.higher[below] = c
+        self.lower[c] = below
+        self.higher[c] = above
+        if above:
+            self.lower[above] = c
+        else:
+            self.max = c
+
+    def unlink(self, c):
+        below, above = self.lower[c], self.higher[c]
+        self.higher[below] = above
+        if above:
+            self.lower[above] = below
+        else:
+            self.max = below
+
+    def push(self, seq, dm):
+        k = dm.content
+        q = self.items.get(k)
+        if q is None:
+            q = self.items[k] = deque()
+        q.append((seq, dm))
+        c = len(q)
+        buckets = self.buckets
+        if c == len(buckets):
+            buckets.append({})
+            self.higher.append(0)
+            self.lower.append(0)
+        bucket = buckets[c]
+        if not bucket:
+            self.link(c, c-1 if c > 1 else 0)
+        bucket[k] = None
+        if c > 1:
+            bucket = buckets[c-1]
+            del bucket[k]
+            if not bucket:
+                self.unlink(c-1)
+
+    def pop(self, dm):
+        """移除dm.content最早的一次出现"""
+        k = dm.content
+        q = self.items[k]
+        c = len(q)
+        bucket = self.buckets[c]
+        del bucket[k]
+        q.popleft()
+        if q:
+            below = self.buckets[c-1]
+            if not below:
+                self.link(c-1, self.lower[c])
+            below[k] = None
+        else:
+            del self.items[k]
+        if not bucket:
+            self.unlink(c)
+
+    def __len__(self):
+        return len(self.items)
+
+    def top(self, n=0):
+        """
+        return: List[tuple(Danmaku, cnt),...]，Danmaku是该内容最新的一条
+        """
+        items = self.items
+        first = lambda k: items[k][0][0]
+        res = []
+        c = self.max
+        while c:
+            bucket = self.buckets[c]
+            need = n - len(res)
+            if n > 0 and need < len(bucket):
+                # 最后一个桶只取需要的几个
+                keys = heapq.nsmallest(need, bucket, key=first)
+            else:
+                keys = sorted(bucket, key=first)
+            res.extend((items[k][-1][1], c) for k in keys)
+            if n > 0 and len(res) >= n:
+                break
+            c = self.lower[c]
+        return res
+
 class DanmakuList():
-    def __init__(self, duration=60) -> None:
+    """
+    弹幕滑动窗口，按加入时clock()的时间(默认单调时钟秒数)过期，不看Danmaku.stime。
+    threadsafe=False时不加锁，适用于所有访问都在同一个事件循环里的情况。
+    strings: 字符串驻留表(dulunche.intern)，add时把content和sender过一遍，
+    用于不是本进程解码器产出的弹幕(进程池解码或其他来源)。
+    """
+    def __init__(self, duration=60, clock=time.monotonic, threadsafe=True, strings=None) -> None:
         self.duration = duration
-        self.lock = threading.Lock()
-        self.dmlist = []
-    
+        self.strings = strings
+        self.clock = clock
+        self.lock = threading.Lock() if threadsafe else nullcontext()
+        self.dmlist = deque()
+        self.stamps = deque()
+        self.seq = 0
+        self.counters = {'all': ContentCounter()}
+
+    def _expire(self, now):
+        """丢掉早于now-duration的弹幕，调用方持有锁"""
+        t0 = now - self.duration
+        stamps = self.stamps
+        while stamps and stamps[0] < t0:
+            stamps.popleft()
+            dm = self.dmlist.popleft()
+            self.counters['all'].pop(dm)
+            self.counters[dm.dmtype].pop(dm)
+
     def refresh(self):
-        t0 = datetime.now() - timedelta(seconds=self.duration)
-        while len(self.dmlist) > 0:
-            if self.dmlist[0].stime < t0:
-                with self.lock:
-                    self.dmlist.pop(0)
-            else:
-                break
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
     
     def add(self, danmu):
-        self.refresh()
+        if self.strings is not None:
+            danmu.content = self.strings.intern(danmu.content)
+            danmu.sender = self.strings.intern(danmu.sender)
+        now = self.clock()
         with self.lock:
+            self._expire(now)
             self.dmlist.append(danmu)
+            self.stamps.append(now)
+            self.seq += 1
+            self.counters['all'].push(self.seq, danmu)
+            counter = self.counters.get(danmu.dmtype)
+            if counter is None:
+                counter = self.counters[danmu.dmtype] = ContentCounter()
+            counter.push(self.seq, danmu)
 
     def __len__(self):
-        self.refresh()
-        return len(self.dmlist)
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
+            return len(self.dmlist)
     
-    def count(self, top=0, type='all') -> dict:
+    def count(self, top=0, type='all') -> list:
         """
-        return: List[tuple(Danmaku, cnt),...]
+        return: List[tuple(Danmaku, cnt),...]，按cnt从大到小
         """
-        self.refresh()
-        res = {}
+        now = self.clock()
         with self.lock:
-            for dm in self.dmlist:
-                if type == 'all' or type == dm.dmtype:
-                    k = dm.content
-                    if not res.get(k):
-                        res[k] = (1, dm)
-                    else:
-                        res[k] = (res[k][0]+1, dm)
-        
-        res = sorted(res.items(), key=lambda x: x[1][0], reverse=True)
-        if top>0:
-            res = res[:top]
-        res = [(it[1][1],it[1][0]) for it in res]
-        return res
-
+            self._expire(now)
+            counter = self.counters.get(type)
+            if counter is None:
+                return []
+            return counter.top(top)
@@ -1,10 +1,50 @@
 from datetime import datetime
-import re, asyncio, aiohttp
+import re, sys, time, asyncio, logging
 
-__all__ = ["DanmakuClient"]
+__all__ = ["DanmakuClient", "PacketDecoder"]
+
+class DecodeStats():
+    """逐帧解码延迟统计：从收到帧到解析完成，单位秒；histogram不为空时同时记入直方图"""
+    def __init__(self, histogram=None) -> None:
+        self.histogram = histogram
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.offloaded = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, latency, offloaded=False):
+        self.frames += 1
+        self.offloaded += offloaded
+        self.total += latency
+        self.last = latency
+        if latency > self.max:
+            self.max = latency
+        if self.histogram is not None:
+            self.histogram.observe(latency)
+
+    def __str__(self) -> str:
+        avg = self.total / self.frames if self.frames else 0.0
+        return f'{self.frames}帧 (池内 {self.offloaded}), 平均 {avg*1e3:.2f}ms, 最大 {self.max*1e3:.2f}ms'
 
 class DanmakuClient:
-    def __init__(self, url, q, **kargs):
+    def __init__(self, url, q, cmds=None, decode_workers=0, decode_executor='thread', offload_bytes=2048, recorder=None, session=None, metrics=None, live=None, dmfilter=None, ws_session=None, keep_other=False, **kargs):
+        """
+        keep_other: cmds之外的消息也以msg_type为other入队（带raw_body），默认直接跳过
+        dmfilter: dulunche.filters.DanmakuFilter，解码时直接丢弃不要的弹幕，按原因计入self.rejected和metrics.rejected
+        metrics: dulunche.metrics.PipelineMetrics，记录帧数、包数、解码延迟和重连
+        live: dulunche.live.LiveStatus，收到LIVE/PREPARING时更新开播状态；cmds需包含这两个
+        session: 共享的aiohttp.ClientSession，由调用方负责关闭；不传则自建一个
+        ws_session: 建websocket用的会话，不传则用session；websocket整个连接期间都占着连接池的名额，
+            多房间共用时应单独给一个不限连接数的会话，免得把HTTP请求和后面的房间卡住
+        recorder: dulunche.record.FrameRecorder或录制文件路径，原样保存收到的每一帧
+        decode_workers: 大于0时，压缩帧交给线程池/进程池解压解析，输出仍保持到达顺序
+        decode_executor: thread或process
+        offload_bytes: 压缩数据小于此大小的帧仍在事件循环里直接解码
+        """
         self.__url = ""
         self.__site = None
         self.__usite = None
@@ -12,6 +52,25 @@ class DanmakuClient:
         self.__ws = None
         self.__stop = False
         self.__dm_queue = q
+        self.__cmds = cmds
+        self.__decode_workers = decode_workers
+        self.__decode_executor = decode_executor
+        self.__offload_bytes = offload_bytes
+        self.__pool = None
+        self.__ordered = None
+        self.__metrics = metrics
+        self.__live = live
+        self.__dmfilter = dmfilter
+        self.__keep_other = keep_other
+        self.rejected = {}
+        self.decode_stats = DecodeStats(metrics.decode_seconds if metrics is not None else None)
+        self.reconnects = 0
+        self.last_gap = 0.0
+        self.__own_recorder = isinstance(recorder, str)
+        if self.__own_recorder:
+            from dulunche.record import FrameRecorder
+            recorder = FrameRecorder(recorder)
+        self.__recorder = recorder
         self.__link_status = True
         self.__extra_data = kargs
         if "http://" == url[:7] or "https://" == url[:8]:
@@ -19,21 +78,93 @@ class DanmakuClient:
         else:
             self.__url = "http://" + url
         self.__site = Bilibili
-        self.__hs = aiohttp.ClientSession()
+        self.__decoder = PacketDecoder()
+        self.__own_session = session is None
+        # aiohttp只有真正连接时才需要，只做解析的场景（回放、分析、进程池）不导入
+        import aiohttp
+        self.__client_errors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self.__binary = aiohttp.WSMsgType.BINARY
+        self.__hs = aiohttp.ClientSession() if session is None else session
+        self.__ws_session = self.__hs if ws_session is None else ws_session
 
     async def init_ws(self):
-        ws_url, reg_datas = await self.__site.get_ws_info(self.__url)
-        self.__ws = await self.__hs.ws_connect(ws_url, headers=self.__site.headers)
-        for reg_data in reg_datas:
-            if type(reg_data) == str:
-                await self.__ws.send_str(reg_data)
-            else:
-                await self.__ws.send_bytes(reg_data)
+        for _ in range(2):
+            ws_urls, reg_datas = await self.__site.get_ws_info(self.__url, self.__hs)
+            # 新连接不接上一个连接残留的半包
+            self.__decoder = PacketDecoder()
+            self.__ws = await self.connect_hosts(ws_urls)
+            for reg_data in reg_datas:
+                if type(reg_data) == str:
+                    await self.__ws.send_str(reg_data)
+                else:
+                    await self.__ws.send_bytes(reg_data)
+            if await self.check_auth():
+                return
+            await self.__ws.close()
+            logging.warning('弹幕服务器认证失败，重新获取token.')
+            self.__site.invalidate_token(self.__url)
+        raise ConnectionError('弹幕服务器认证失败')
+
+    async def connect_hosts(self, ws_urls):
+        """按顺序尝试getDanmuInfo返回的服务器，连上的服务器挪到最前面，下次重连优先使用"""
+        error = None
+        for i, ws_url in enumerate(ws_urls):
+            try:
+                ws = await asyncio.wait_for(self.__ws_session.ws_connect(ws_url, headers=self.__site.headers), 10)
+                if i > 0:
+                    ws_urls.insert(0, ws_urls.pop(i))
+                return ws
+            except self.__client_errors as e:
+                logging.warning(f'连接弹幕服务器 {ws_url} 失败: {e!r}')
+                error = e
+        raise ConnectionError(f'弹幕服务器均连接失败: {error!r}')
+
+    async def check_auth(self):
+        """读取认证回复(op 8)，code不为0说明token被拒绝；同一帧里的其他消息照常入队"""
+        try:
+            msg = await self.__ws.receive(timeout=10)
+        except asyncio.TimeoutError:
+            return False
+        if msg.type != self.__binary:
+            return False
+        self.on_frame(msg)
+        packets = list(self.__decoder.feed(msg.data))
+        ok = True
+        for op, body in packets:
+            if op == 8:
+                ok = json_loads(body).get('code', 0) == 0
+        rejected = {}
+        await self.put_msgs(self.__site.parse_packets([it for it in packets if it[0] != 8], self.__cmds, self.__dmfilter, rejected, self.__keep_other), rejected)
+        return ok
+
+    async def reconnect(self):
+        """断线后立即重连，失败时指数退避，返回断线时长"""
+        closed = time.monotonic()
+        delay = 0.5
+        while self.__stop != True:
+            try:
+                await self.init_ws()
+                break
+            except Exception as e:
+                logging.warning(f'弹幕服务器重连失败: {e}，{delay:.1f}s后重试.')
+                await asyncio.sleep(delay)
+                delay = min(delay*2, 30)
+        gap = time.monotonic() - closed
+        self.reconnects += 1
+        self.last_gap = gap
+        if self.__metrics is not None:
+            self.__metrics.reconnects.inc()
+            self.__metrics.reconnect_gap.set(gap)
+        logging.info(f'弹幕服务器已重连，断线 {gap:.2f}s.')
+        return gap
 
     async def heartbeats(self):
         while self.__stop != True:
             # print('heartbeat')
             await asyncio.sleep(20)
+            if self.__pool is not None and self.decode_stats.frames:
+                logging.info(f'弹幕解码: {self.decode_stats}')
+                self.decode_stats.reset()
             try:
                 if type(self.__site.heartbeat) == str:
                     await self.__ws.send_str(self.__site.heartbeat)
@@ -46,38 +177,237 @@ class DanmakuClient:
         while self.__stop != True:
             async for msg in self.__ws:
                 # self.__link_status = True
-                ms = self.__site.decode_msg(msg.data)
-                for m in ms:
-                    if not m.get('time',0):
-                        m['time'] = datetime.now()
-                    await self.__dm_queue.put(m)
+                self.on_frame(msg)
+                if self.__pool is not None:
+                    await self.__ordered.put(self.submit_frame(msg.data))
+                    continue
+                t0 = time.perf_counter()
+                rejected = {}
+                ms = self.__site.decode_msg(msg.data, self.__decoder, self.__cmds, self.__dmfilter, rejected, self.__keep_other)
+                self.decode_stats.record(time.perf_counter() - t0)
+                await self.put_msgs(ms, rejected)
             if self.__stop != True:
-                await asyncio.sleep(1)
-                await self.init_ws()
-                await asyncio.sleep(1)
+                await self.reconnect()
+
+    def on_frame(self, msg):
+        if self.__recorder is not None and msg.type == self.__binary:
+            self.__recorder.write(msg.data)
+        if self.__metrics is not None:
+            self.__metrics.frames.inc()
+            self.__metrics.last_frame = time.monotonic()
+
+    async def put_msgs(self, ms, rejected=None):
+        if rejected:
+            for reason, n in rejected.items():
+                self.rejected[reason] = self.rejected.get(reason, 0) + n
+                if self.__metrics is not None:
+                    self.__metrics.rejected[reason].inc(n)
+        if self.__metrics is not None:
+            self.__metrics.packets.inc(len(ms))
+        for m in ms:
+            if not m.get('time',0):
+                m['time'] = datetime.now()
+            if self.__live is not None and m['msg_type'] in ('live', 'preparing'):
+                self.__live.on_msg(m)
+            await self.__dm_queue.put(m)
+
+    def submit_frame(self, data):
+        """
+        在事件循环上拆出websocket层的包（保留半包），
+        压缩数据够大时交给池解压解析，否则直接解码。
+        返回(到达时间, 是否进池, future)，按到达顺序放进self.__ordered。
+        """
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        if not isinstance(data, (bytes, bytearray)):
+            packets = []
+        else:
+            packets = list(self.__decoder.split(data))
+        size = sum(len(body) for ver, _, body in packets if ver == 2 or ver == 3)
+        if size >= self.__offload_bytes:
+            if self.__decode_executor == 'process':
+                packets = [(ver, op, bytes(body)) for ver, op, body in packets]
+            return t0, True, loop.run_in_executor(self.__pool, decode_packets, packets, self.__cmds, self.__dmfilter, self.__keep_other)
+        fut = loop.create_future()
+        fut.set_result(decode_packets(packets, self.__cmds, self.__dmfilter, self.__keep_other))
+        return t0, False, fut
+
+    async def drain_decoded(self):
+        loop = asyncio.get_running_loop()
+        while self.__stop != True:
+            t0, offloaded, fut = await self.__ordered.get()
+            try:
+                ms, rejected = await fut
+            except Exception as e:
+                logging.error(f'弹幕解码失败: {e}')
+                continue
+            self.decode_stats.record(loop.time() - t0, offloaded)
+            await self.put_msgs(ms, rejected)
 
     async def start(self):
         if self.__site != None:
             await self.init_ws()
-            await asyncio.gather(
-                self.heartbeats(),
-                self.fetch_danmaku(),
-            )
+            tasks = [self.heartbeats(), self.fetch_danmaku()]
+            if self.__decode_workers > 0:
+                if self.__pool is None:
+                    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+                    executor = ProcessPoolExecutor if self.__decode_executor == 'process' else ThreadPoolExecutor
+                    self.__pool = executor(max_workers=self.__decode_workers)
+                self.__ordered = asyncio.Queue(maxsize=self.__decode_workers*4)
+                tasks.append(self.drain_decoded())
+            # 任意一个出错或被取消时其余的也要停下，否则drain_decoded会一直等在队列上，每次重连漏一个任务
+            tasks = [asyncio.ensure_future(t) for t in tasks]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
         else:
             await self.__usite.run(self.__url, self.__dm_queue, self.__hs, **self.__extra_data)
 
     async def stop(self):
         self.__stop = True
-        if self.__site != None:
-            await self.__hs.close()
-        else:
+        if self.__pool is not None:
+            # cancel_futures是3.9加的，3.7/3.8上只能不等待地关闭，排队中的帧会解完再丢弃
+            if sys.version_info >= (3, 9):
+                self.__pool.shutdown(wait=False, cancel_futures=True)
+            else:
+                self.__pool.shutdown(wait=False)
+            self.__pool = None
+        if self.__recorder is not None:
+            if self.__own_recorder:
+                self.__recorder.close()
+            else:
+                self.__recorder.flush()
+        if self.__site == None:
             await self.__usite.stop()
+        if self.__own_session:
             await self.__hs.close()
+        elif self.__ws is not None:
+            await self.__ws.close()
 
 from datetime import datetime
-import json, re, select, random, traceback
-import asyncio, aiohttp, zlib, brotli
-from struct import pack, unpack
+import json, re
+import asyncio, zlib
+from struct import pack, Struct
+
+from dulunche.emoticon import emoticons
+from dulunche.intern import strings
+
+# 解码热路径上直接调用绑定方法
+intern = strings.intern
+
+try:
+    # 可选的快速JSON后端，可直接解析memoryview
+    from orjson import loads as json_loads
+except ImportError:
+    def json_loads(data):
+        return json.loads(bytes(data))
+
+HEADER = Struct('!IHHII')
+HEADER_LEN = HEADER.size
+# 单个包的长度上限，和aiohttp默认的websocket消息上限一致；超过的视为包头损坏
+MAX_PACKET_LEN = 1 << 22
+CMD_PATTERN = re.compile(rb'"cmd"\s*:\s*"([^":]*)')
+CMD_PEEK = 96
+
+def valid_header(packet_len, header_len, ver):
+    return header_len == HEADER_LEN and 0 <= ver <= 3 and HEADER_LEN <= packet_len <= MAX_PACKET_LEN
+
+def starts_with_header(data):
+    if len(data) < HEADER_LEN:
+        return False
+    packet_len, header_len, ver, _, _ = HEADER.unpack_from(data, 0)
+    return valid_header(packet_len, header_len, ver)
+
+def iter_packets(view):
+    """
+    逐个产出view中完整的包(ver, op, body)，body是memoryview，不解压。
+    返回已消费的字节数，末尾的半包不计入。
+    """
+    offset = 0
+    end = len(view)
+    while offset + HEADER_LEN <= end:
+        packet_len, header_len, ver, op, _ = HEADER.unpack_from(view, offset)
+        if not valid_header(packet_len, header_len, ver):
+            # 包头损坏，丢弃剩余数据，不留作半包
+            return end
+        if offset + packet_len > end:
+            break
+        yield ver, op, view[offset+HEADER_LEN:offset+packet_len]
+        offset += packet_len
+    return offset
+
+def expand(packets):
+    """把(ver, op, body)中的压缩包(ver 2/3)原地展开，产出(op, body)，不递归"""
+    stack = [iter(packets)]
+    while stack:
+        for ver, op, body in stack[-1]:
+            if ver == 2 or ver == 3:
+                # 在try外面取解压模块：缺少brotli时要报错，不能当成坏包把ver 3的消息全部丢掉
+                codec = zlib if ver == 2 else load_brotli()
+                try:
+                    inner = codec.decompress(body)
+                except codec.error:
+                    continue
+                stack.append(iter_packets(memoryview(inner)))
+                break
+            elif ver == 0 or ver == 1:
+                yield op, body
+        else:
+            stack.pop()
+
+class PacketDecoder():
+    """
+    B站弹幕协议的流式解包器，一个连接一个实例。
+    split()产出websocket层的(ver, op, body)，feed()在此基础上解压，产出(op, body)；
+    body是指向原数据的memoryview。
+    消息末尾不完整的包会留到下一次拼接，因此每次返回的迭代器都要完整迭代。
+    包头不合法的数据直接丢弃，下一条消息以合法包头开头时也丢弃残留，残留最多一个包长。
+    """
+    def __init__(self) -> None:
+        self.pending = b''
+
+    def split(self, data):
+        if self.pending:
+            # 新消息本身以合法包头开头，说明残留的不是半包而是垃圾，丢掉，
+            # 否则这段残留会把之后每一帧都错位
+            if not starts_with_header(data):
+                data = self.pending + data
+            self.pending = b''
+        view = memoryview(data)
+        offset = yield from iter_packets(view)
+        if offset < len(view):
+            self.pending = bytes(view[offset:])
+
+    def feed(self, data):
+        return expand(self.split(data))
+
+def peek_cmd(body):
+    """
+    不解析JSON，直接从包体开头扫出cmd（去掉DANMU_MSG:4:0:2:2:2:0这类后缀），
+    找不到时返回None。
+    """
+    m = CMD_PATTERN.search(body[:CMD_PEEK])
+    if m is None:
+        return None
+    return m.group(1).decode('ascii', 'replace')
+
+brotli = None
+
+def load_brotli():
+    """只有ver 3的包才用到brotli，第一次用到时再导入"""
+    global brotli
+    if brotli is None:
+        import brotli
+    return brotli
+
+def decompress(ver, body):
+    if ver == 2:
+        return zlib.decompress(body)
+    # version3: 参考https://github.com/biliup/biliup/blob/master/biliup/plugins/Danmaku/bilibili.py
+    return load_brotli().decompress(body)
 
 class Bilibili():
     heartbeat = b"\x00\x00\x00\x1f\x00\x10\x00\x01\x00\x00\x00\x02\x00\x00\x00\x01\x5b\x6f\x62\x6a\x65\x63\x74\x20\x4f\x62\x6a\x65\x63\x74\x5d"
@@ -90,19 +420,49 @@ class Bilibili():
     }
     interval = 30
 
-    async def get_ws_info(url):
-        url = "https://api.live.bilibili.com/room/v1/Room/room_init?id=" + url.split("/")[-1]
+    default_ws_urls = ["wss://broadcastlv.chat.bilibili.com/sub"]
+    # 房间号(可能是短号) -> (真实房间号, 过期时间)
+    room_ids = {}
+    room_id_ttl = 3600
+    # 真实房间号 -> (token, [ws_url, ...])，只在被弹幕服务器拒绝时刷新
+    tokens = {}
+
+    async def get_room_id(url, session):
+        short_id = url.split("/")[-1]
+        cached = Bilibili.room_ids.get(short_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        async with session.get("https://api.live.bilibili.com/room/v1/Room/room_init?id=" + short_id, headers=Bilibili.headers) as resp:
+            room_json = await resp.json()
+            room_id = room_json["data"]["room_id"]
+        Bilibili.room_ids[short_id] = (room_id, time.monotonic() + Bilibili.room_id_ttl)
+        return room_id
+
+    def invalidate_token(url):
+        cached = Bilibili.room_ids.get(url.split("/")[-1])
+        if cached is not None:
+            Bilibili.tokens.pop(cached[0], None)
+
+    async def get_ws_info(url, session=None):
+        """返回(按顺序尝试的ws地址列表, 认证包列表)"""
+        if session is None:
+            import aiohttp
+            async with aiohttp.ClientSession() as session:
+                return await Bilibili.get_ws_info(url, session)
+
         reg_datas = []
-        async with aiohttp.ClientSession(headers=Bilibili.headers) as session:
-            async with session.get(url) as resp:
+        room_id = await Bilibili.get_room_id(url, session)
+        cached = Bilibili.tokens.get(room_id)
+        if cached is None:
+            async with session.get(f'https://api.live.bilibili.com/xlive/web-room/v1/index/getDanmuInfo?id={room_id}', headers=Bilibili.headers) as resp:
                 room_json = await resp.json()
-                room_id = room_json["data"]["room_id"]
+            host_list = room_json['data'].get('host_list') or []
+            ws_urls = [f"wss://{h['host']}:{h.get('wss_port', 443)}/sub" for h in host_list]
+            cached = Bilibili.tokens[room_id] = (room_json['data']['token'], ws_urls or list(Bilibili.default_ws_urls))
+        token, ws_urls = cached
+        # 请求的是protover 3(brotli)，缺少brotli时连接前就报错
+        load_brotli()
 
-        async with aiohttp.ClientSession(headers=Bilibili.headers) as session:
-            async with session.get(f'https://api.live.bilibili.com/xlive/web-room/v1/index/getDanmuInfo?id={room_id}') as resp:
-                room_json = await resp.json()
-                token = room_json['data']['token']
-            
         data = json.dumps({
             "roomid": room_id, 
             "uid": 0, 
@@ -121,80 +481,83 @@ class Bilibili():
         )
         reg_datas.append(data)
 
-        return "wss://broadcastlv.chat.bilibili.com/sub", reg_datas
+        return ws_urls, reg_datas
     
-    def decode_msg(data):
-        dm_list = []
-        msgs = []
+    # 独轮车只关心的cmd，LIVE/PREPARING用于开播下播检测
+    danmaku_cmds = frozenset(['DANMU_MSG', 'LIVE_INTERACTIVE_GAME', 'LIVE', 'PREPARING'])
 
-        def decode_packet(packet_data):
-            dm_list = []
-            while True:
-                try:
-                    packet_len, header_len, ver, op, seq = unpack('!IHHII', packet_data[0:16])
-                except Exception:
-                    break
-                if len(packet_data) < packet_len:
-                    break
-
-                if ver == 2:
-                    dm_list.extend(decode_packet(zlib.decompress(packet_data[16:packet_len])))\
-                # version3: 参考https://github.com/biliup/biliup/blob/master/biliup/plugins/Danmaku/bilibili.py
-                elif ver == 3:
-                    dm_list.extend(decode_packet(brotli.decompress(packet_data[16:packet_len])))
-                elif ver == 0 or ver == 1:
-                    dm_list.append({
-                        'type': op,
-                        'body': packet_data[16:packet_len]
-                    })
-                else:
-                    break
-
-                if len(packet_data) == packet_len:
-                    break
-                else:
-                    packet_data = packet_data[packet_len:]
-            return dm_list
-
-        dm_list = decode_packet(data)
+    def decode_msg(data, decoder=None, cmds=None, dmfilter=None, rejected=None, keep_other=False):
+        """
+        cmds: 需要完整解析的cmd集合，None表示全部解析。
+        其余op 5的包只扫一下cmd就跳过，不复制也不生成消息；
+        keep_other为True时才以{'msg_type': 'other', 'cmd': ..., 'raw_body': bytes}返回，
+        需要时再用json_loads(msg['raw_body'])解析。
+        dmfilter/rejected: 见parse_packets
+        """
+        if not isinstance(data, (bytes, bytearray)):
+            return []
+        if decoder is None:
+            decoder = PacketDecoder()
+        return Bilibili.parse_packets(decoder.feed(data), cmds, dmfilter, rejected, keep_other)
 
-        for i, dm in enumerate(dm_list):
+    def parse_packets(packets, cmds=None, dmfilter=None, rejected=None, keep_other=False):
+        """
+        把(op, body)解析成消息dict。
+        dmfilter: dulunche.filters.DanmakuFilter，弹幕JSON解析后先过一遍，被拒绝的不生成消息，
+        按原因计入rejected字典。
+        keep_other: 见decode_msg
+        """
+        msgs = []
+        for op, body in packets:
             try:
                 msg = {}
-                if dm.get('type') == 5:
-                    j = json.loads(dm.get('body'))
+                if op == 5 and cmds is not None:
+                    cmd = peek_cmd(body)
+                    if cmd is not None and cmd not in cmds:
+                        if keep_other:
+                            msgs.append({"name": "", "content": None, "msg_type": "other", "cmd": cmd, "raw_body": bytes(body)})
+                        continue
+                if op == 5:
+                    j = json_loads(body)
+                    if dmfilter is not None and ('DANMU_MSG' in j.get('cmd') or j.get('cmd') == 'LIVE_INTERACTIVE_GAME'):
+                        reason = dmfilter(j)
+                        if reason is not None:
+                            if rejected is not None:
+                                rejected[reason] = rejected.get(reason, 0) + 1
+                            continue
                     msg['msg_type'] = {
                         'SEND_GIFT': 'gift',
                         'DANMU_MSG': 'danmaku',
                         'WELCOME': 'enter',
                         'NOTICE_MSG': 'broadcast',
-                        'LIVE_INTERACTIVE_GAME': 'interactive_danmaku'  # 新增互动弹幕，经测试与弹幕内容一致
+                        'LIVE_INTERACTIVE_GAME': 'interactive_danmaku',  # 新增互动弹幕，经测试与弹幕内容一致
+                        'LIVE': 'live',
+                        'PREPARING': 'preparing',
                     }.get(j.get('cmd'), 'other')
 
                     if 'DANMU_MSG' in j.get('cmd'):
                         msg["msg_type"] = "danmaku"
 
                     if msg["msg_type"] == "danmaku":
-                        msg["name"] = j.get("info", ["", "", ["", ""]])[2][1] or j.get(
+                        # 名字、颜色和内容经过驻留表，重复的共用一个对象
+                        msg["name"] = intern(j.get("info", ["", "", ["", ""]])[2][1] or j.get(
                             "data", {}
-                        ).get("uname", "")
-                        msg["color"] = f"{j.get('info', [[0, 0, 0, 16777215]])[0][3]:06x}"
-                        msg["content"] = j.get("info")[1]
+                        ).get("uname", ""))
+                        msg["color"] = intern(f"{j.get('info', [[0, 0, 0, 16777215]])[0][3]:06x}")
+                        msg["content"] = intern(j.get("info")[1])
                         try:
                             msg['time'] = datetime.fromtimestamp(j.get('info')[0][4]/1000)
                             if j.get('info')[13] != r'{}':
-                                emoticon_info = j.get('info')[0][13]
-                                emoticon_url = emoticon_info['url']
-                                emoticon_desc = j.get('info')[1]
-                                msg["content"] = json.dumps({'url':emoticon_url,'desc':emoticon_desc},ensure_ascii=False)
+                                # content是表情id，同一个表情共用一个字符串，发送时直接当msg用
+                                msg["content"] = emoticons.intern_info(j.get('info')[0][13], j.get('info')[1])
                                 msg['msg_type'] = 'emoticon'
                         except:
                             pass
 
                     elif msg['msg_type'] == 'interactive_danmaku':
                         msg["msg_type"] = "danmaku"
-                        msg['name'] = j.get('data', {}).get('uname', '')
-                        msg['content'] = j.get('data', {}).get('msg', '')
+                        msg['name'] = intern(j.get('data', {}).get('uname', ''))
+                        msg['content'] = intern(j.get('data', {}).get('msg', ''))
                         msg["color"] = 'ffffff'
                         
                     elif msg["msg_type"] == "broadcast":
@@ -205,7 +568,7 @@ class Bilibili():
 
                     msg["raw_data"] = j                    
                 else:
-                    msg = {"name": "", "content": dm.get('body'), "msg_type": "other"}
+                    msg = {"name": "", "content": bytes(body), "msg_type": "other"}
                 msgs.append(msg)
             except Exception as e:
                 # traceback.print_exc()
@@ -213,3 +576,13 @@ class Bilibili():
                 pass
 
         return msgs
+
+
+def decode_packets(packets, cmds=None, dmfilter=None, keep_other=False):
+    """
+    解压并解析一组websocket层的包，供线程池/进程池调用。
+    packets: [(ver, op, bytes), ...]
+    返回(消息列表, {过滤原因: 条数})
+    """
+    rejected = {}
+    return Bilibili.parse_packets(expand(packets), cmds, dmfilter, rejected, keep_other), rejected
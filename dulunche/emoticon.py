@@ -0,0 +1,90 @@
+"""
+表情登记表：表情弹幕的content是表情的emoticon_unique（如room_23197314_16240），
+同一个表情只存一份元数据和一个字符串对象，计数按id精确合并，发送时可以直接当msg用。
+直播间的表情列表(GetEmoticons)按房间缓存，过期后重新获取。
+"""
+import time
+import logging
+
+__all__ = ["Emoticon", "EmoticonRegistry", "emoticons"]
+
+class Emoticon():
+    __slots__ = ('unique', 'desc', 'url', 'width', 'height')
+
+    def __init__(self, unique, desc='', url='', width=0, height=0) -> None:
+        self.unique = unique
+        self.desc = desc
+        self.url = url
+        self.width = width
+        self.height = height
+
+    def __repr__(self) -> str:
+        return f'Emoticon({self.unique!r}, {self.desc!r})'
+
+class EmoticonRegistry():
+    def __init__(self, room_ttl=3600) -> None:
+        # emoticon_unique -> Emoticon
+        self.emoticons = {}
+        # 真实房间号 -> 过期时间
+        self.rooms = {}
+        self.room_ttl = room_ttl
+
+    def __len__(self) -> int:
+        return len(self.emoticons)
+
+    def __contains__(self, unique) -> bool:
+        return unique in self.emoticons
+
+    def get(self, unique):
+        return self.emoticons.get(unique)
+
+    def intern(self, unique, desc='', url='', width=0, height=0):
+        """登记表情，返回登记表里的那个id字符串，相同的表情共用一个对象"""
+        e = self.emoticons.get(unique)
+        if e is None:
+            e = self.emoticons[unique] = Emoticon(unique, desc, url, width, height)
+        elif not e.desc and desc:
+            e.desc = desc
+        return e.unique
+
+    def intern_info(self, info, desc=''):
+        """弹幕info[0][13]里的表情信息"""
+        return self.intern(info['emoticon_unique'], desc, info.get('url', ''), info.get('width', 0), info.get('height', 0))
+
+    def describe(self, unique):
+        """日志里显示用：[描述]，不认识的id原样返回"""
+        e = self.emoticons.get(unique)
+        if e is None or not e.desc:
+            return unique
+        return e.desc if e.desc.startswith('[') else f'[{e.desc}]'
+
+    def add_packages(self, data):
+        """登记GetEmoticons返回的data，返回登记的表情数"""
+        n = 0
+        for package in data.get('data') or []:
+            for it in package.get('emoticons') or []:
+                if it.get('emoticon_unique'):
+                    self.intern(it['emoticon_unique'], it.get('emoji', ''), it.get('url', ''), it.get('width', 0), it.get('height', 0))
+                    n += 1
+        return n
+
+    async def load_room(self, room_id, fetch):
+        """
+        fetch: 返回GetEmoticons结果的协程函数，如 lambda: abapi.get_emoticons(room_id)
+        房间表情在room_ttl内只获取一次，失败只记日志。
+        """
+        expire = self.rooms.get(room_id)
+        if expire is not None and expire > time.monotonic():
+            return 0
+        try:
+            res = await fetch()
+            if res.get('code') != 0:
+                raise RuntimeError(res.get('message') or res.get('msg'))
+        except Exception as e:
+            logging.warning(f'[房间 {room_id}] 获取表情列表失败: {e}')
+            return 0
+        self.rooms[room_id] = time.monotonic() + self.room_ttl
+        return self.add_packages(res['data'])
+
+# 进程内共用一个登记表，解码时往里登记
+emoticons = EmoticonRegistry()
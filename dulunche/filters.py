@@ -0,0 +1,86 @@
+"""
+弹幕过滤：配置在启动时编译成一个DanmakuFilter，直接作用在DANMU_MSG/LIVE_INTERACTIVE_GAME的JSON上。
+交给DanmakuClient后在Bilibili.parse_packets里调用，被拒绝的包只做了一次JSON解析，不会生成消息dict、
+不进队列，只按原因计数。
+    f = DanmakuFilter(filter_medal='fans', up_medal='粉丝团', min_medal_level=5)
+    f(j)    # 返回被过滤的原因，可用的弹幕返回None
+"""
+
+__all__ = ["DanmakuFilter"]
+
+class DanmakuFilter():
+    """
+    filter_medal: medal带牌子就行，fans必须是up_medal，其他值不过滤
+    filter_self: 过滤uname/uid发送的弹幕
+    types: 接受的弹幕类型，danmaku和/或emoticon
+    min_medal_level: 粉丝牌等级下限，0不限制；filter_medal为fans时看的是当前主播的牌子
+    allow_uids: 只接受这些uid的弹幕，不填不限制；deny_uids: 不接受这些uid的弹幕
+    min_length/max_length: 文字弹幕的长度范围，0不限制，表情弹幕不看长度
+    只用可pickle的属性，进程池解码时会复制到子进程。
+    """
+    reasons = ('type', 'self', 'uid', 'medal', 'fans', 'level', 'length')
+
+    def __init__(self,
+                 filter_medal=None,
+                 filter_self=False,
+                 uname=None,
+                 uid=None,
+                 up_medal=None,
+                 types=('danmaku', 'emoticon'),
+                 min_medal_level=0,
+                 allow_uids=None,
+                 deny_uids=None,
+                 min_length=0,
+                 max_length=0) -> None:
+        types = frozenset(types)
+        unknown = types - {'danmaku', 'emoticon'}
+        if unknown:
+            raise ValueError(f'不支持的弹幕类型: {sorted(unknown)}')
+        self.danmaku = 'danmaku' in types
+        self.emoticon = 'emoticon' in types
+        self.self_name = uname if filter_self else None
+        self.self_uid = uid if filter_self else None
+        self.allow_uids = frozenset(int(u) for u in allow_uids) if allow_uids else None
+        self.deny_uids = frozenset(int(u) for u in deny_uids) if deny_uids else frozenset()
+        self.medal = filter_medal if filter_medal in ('medal', 'fans') else None
+        self.up_medal = up_medal
+        self.min_level = int(min_medal_level or 0)
+        self.min_length = int(min_length or 0)
+        self.max_length = int(max_length or 0)
+        self.check_user = self.self_name is not None or self.self_uid is not None or self.allow_uids is not None or bool(self.deny_uids)
+        self.check_medal = self.medal is not None or self.min_level > 0
+        self.check_length = self.min_length > 0 or self.max_length > 0
+
+    @property
+    def noop(self) -> bool:
+        """什么都不过滤，不必交给解码器"""
+        return self.danmaku and self.emoticon and not (self.check_user or self.check_medal or self.check_length)
+
+    def __call__(self, j):
+        info = j.get('info')
+        if info is None:
+            # LIVE_INTERACTIVE_GAME：只有data里的uid、uname和msg，没有粉丝牌信息
+            data = j.get('data', {})
+            uid, uname, content, medal, emoticon = data.get('uid'), data.get('uname', ''), data.get('msg', ''), None, False
+        else:
+            uid, uname = info[2][0], info[2][1]
+            content, medal = info[1], info[3]
+            emoticon = len(info) > 13 and info[13] != r'{}'
+        if not (self.emoticon if emoticon else self.danmaku):
+            return 'type'
+        if self.check_user:
+            if (self.self_uid is not None and uid == self.self_uid) or (self.self_name is not None and uname == self.self_name):
+                return 'self'
+            if uid in self.deny_uids or (self.allow_uids is not None and uid not in self.allow_uids):
+                return 'uid'
+        if self.check_medal:
+            if self.medal == 'medal' and not medal:
+                return 'medal'
+            if self.medal == 'fans' and not (medal and medal[1] == self.up_medal):
+                return 'fans'
+            if self.min_level > 0 and not (medal and medal[0] >= self.min_level):
+                return 'level'
+        if self.check_length and not emoticon:
+            if len(content) < self.min_length or (self.max_length > 0 and len(content) > self.max_length):
+                return 'length'
+        return None
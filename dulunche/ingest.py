@@ -0,0 +1,86 @@
+import asyncio
+from collections import deque
+
+__all__ = ["IngestQueue"]
+
+class IngestQueue(asyncio.Queue):
+    """
+    DanmakuClient和消费者之间的有界队列。队列满时按policy处理：
+    block: put()等待消费者（背压一直传到websocket读取）
+    drop_oldest: 丢掉最早的一条再放入
+    drop_newest: 丢掉新来的这条
+    coalesce: 队列里已有相同内容的弹幕时，把新来的合并进去(repeat+1)，否则同drop_oldest
+    dropped/coalesced记录丢弃和合并的弹幕条数；传入metrics时同时累加到它的queue_dropped/queue_coalesced计数器。
+    """
+    policies = ('block', 'drop_oldest', 'drop_newest', 'coalesce')
+
+    def __init__(self, maxsize=10000, policy='drop_oldest', metrics=None) -> None:
+        if policy not in self.policies:
+            raise ValueError(f'未知的队列策略 {policy}，可选 {self.policies}')
+        self.policy = policy
+        self.metrics = metrics
+        self.dropped = 0
+        self.coalesced = 0
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self._queue = deque()
+        # (msg_type, content) -> 队列中该内容最新的一条
+        self._index = {}
+
+    def _put(self, item):
+        self._queue.append(item)
+        if self.policy == 'coalesce':
+            key = self.key(item)
+            if key is not None:
+                self._index[key] = item
+
+    def _get(self):
+        item = self._queue.popleft()
+        if self._index:
+            key = self.key(item)
+            if key is not None and self._index.get(key) is item:
+                del self._index[key]
+        return item
+
+    @staticmethod
+    def key(item):
+        if item.get('msg_type') in ['danmaku', 'emoticon']:
+            return item['msg_type'], item['content']
+        return None
+
+    async def put(self, item):
+        if self.policy == 'block':
+            return await super().put(item)
+        self.put_nowait(item)
+
+    def put_nowait(self, item):
+        if self.policy == 'block' or not self.full():
+            return super().put_nowait(item)
+        if self.policy == 'drop_newest':
+            self.drop(1)
+            return
+        if self.policy == 'coalesce':
+            key = self.key(item)
+            queued = self._index.get(key) if key is not None else None
+            if queued is not None:
+                queued['repeat'] = queued.get('repeat', 1) + item.get('repeat', 1)
+                self.coalesced += 1
+                if self.metrics is not None:
+                    self.metrics.queue_coalesced.inc()
+                return
+        oldest = super().get_nowait()
+        self.drop(oldest.get('repeat', 1))
+        super().put_nowait(item)
+
+    def drop(self, n):
+        self.dropped += n
+        if self.metrics is not None:
+            self.metrics.queue_dropped.inc(n)
+
+    async def get_many(self, maxitems=256):
+        """等到至少有一条，然后一次取走最多maxitems条，消费者每批只唤醒一次"""
+        items = [await self.get()]
+        while len(items) < maxitems and not self.empty():
+            items.append(self.get_nowait())
+        return items
@@ -0,0 +1,53 @@
+"""
+弹幕内容和发送者名字的字符串驻留：刷屏时同一句话、同一个名字会出现成千上万次，
+json.loads每次都新建一个str。解码时经过驻留表后，相同的字符串共用一个对象，
+窗口里只存一份；计数时dict按身份比较直接命中，哈希值也只算一次。
+驻留表有上限，按最近使用淘汰，冷门字符串不会一直占着内存。
+"""
+from collections import OrderedDict
+
+__all__ = ["InternTable", "strings"]
+
+class InternTable():
+    """
+    maxsize: 最多保留的字符串数，0表示不驻留（原样返回）
+    线程池解码时可能多个线程同时调用：最坏情况是同一个字符串多出一个对象或多淘汰一个，不会出错。
+    """
+    def __init__(self, maxsize=16384) -> None:
+        self.maxsize = maxsize
+        self.table = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def intern(self, s):
+        """返回表里和s相等的那个对象，没有就把s放进去"""
+        if not self.maxsize:
+            return s
+        table = self.table
+        v = table.get(s)
+        if v is not None:
+            try:
+                table.move_to_end(s)
+            except KeyError:
+                # 刚被别的线程淘汰
+                pass
+            return v
+        table[s] = s
+        if len(table) > self.maxsize:
+            try:
+                table.popitem(last=False)
+            except KeyError:
+                pass
+        return s
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.table) > maxsize:
+            self.table.popitem(last=False)
+
+    def clear(self):
+        self.table.clear()
+
+# 解码器和弹幕窗口共用
+strings = InternTable()
@@ -0,0 +1,151 @@
+"""
+直播状态：由弹幕连接里的LIVE/PREPARING消息驱动，开播下播一秒内就能知道，
+HTTP查询只在启动时和低频兜底时使用。
+    status = LiveStatus()
+    DanmakuClient(url, q, live=status)
+    async for event in status.subscribe(): ...    # 协程里订阅
+    await status.wait_for(True)                   # 协程里等待开播
+    status.wait(True, timeout=60)                 # 普通线程里等待开播
+"""
+import time
+import asyncio
+import logging
+import threading
+
+__all__ = ["LiveStatus", "LiveWatcher"]
+
+class LiveStatus():
+    def __init__(self, room_id=None) -> None:
+        self.room_id = room_id
+        # None表示还不知道
+        self.live = None
+        self.since = None
+        self.__subscribers = []
+        self.__cond = threading.Condition()
+
+    def set(self, live, source='ws'):
+        """更新状态，只有变化时才通知订阅者；可以在任意线程调用"""
+        live = bool(live)
+        with self.__cond:
+            if live == self.live:
+                return False
+            first = self.live is None
+            self.live = live
+            self.since = time.time()
+            event = {'live': live, 'source': source, 'time': self.since}
+            self.__cond.notify_all()
+            subscribers = list(self.__subscribers)
+        if not first:
+            logging.info(f"[房间 {self.room_id}] 检测到{'开播' if live else '下播'}({source}).")
+        for loop, q in subscribers:
+            loop.call_soon_threadsafe(q.put_nowait, event)
+        return True
+
+    def on_msg(self, msg):
+        """DanmakuClient收到的消息，LIVE/PREPARING之外的忽略"""
+        if msg['msg_type'] == 'live':
+            self.set(True)
+        elif msg['msg_type'] == 'preparing':
+            self.set(False)
+
+    async def subscribe(self):
+        """
+        异步迭代状态变化事件：{'live': bool, 'source': 'ws'|'poll', 'time': unix时间戳}。
+        第一次迭代时才开始订阅。
+        """
+        q = asyncio.Queue()
+        item = (asyncio.get_running_loop(), q)
+        with self.__cond:
+            self.__subscribers.append(item)
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            with self.__cond:
+                self.__subscribers.remove(item)
+
+    async def wait_for(self, live):
+        """在协程里等到状态变为live"""
+        q = asyncio.Queue()
+        item = (asyncio.get_running_loop(), q)
+        with self.__cond:
+            if self.live == live:
+                return
+            self.__subscribers.append(item)
+        try:
+            while (await q.get())['live'] != live:
+                pass
+        finally:
+            with self.__cond:
+                self.__subscribers.remove(item)
+
+    def wait(self, live, timeout=None):
+        """在普通线程里阻塞等待，超时返回False"""
+        with self.__cond:
+            return self.__cond.wait_for(lambda: self.live == live, timeout)
+
+    async def poll(self, fetch, interval=300):
+        """
+        兜底：每interval秒用fetch()查一次，防止错过LIVE/PREPARING消息（比如断线期间开播）。
+        fetch是返回live_status的协程函数，1为直播中。
+        """
+        while True:
+            try:
+                self.set(await fetch() == 1, 'poll')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f'[房间 {self.room_id}] 获取直播状态失败: {e}')
+            await asyncio.sleep(interval)
+
+async def get_live_status(room_id, session):
+    """HTTP查询直播状态：0未开播，1直播中，2轮播"""
+    from dulunche.dmc import Bilibili
+    async with session.get('https://api.live.bilibili.com/room/v1/Room/get_info',
+                           params={'room_id': room_id}, headers=Bilibili.headers) as resp:
+        j = await resp.json(content_type=None)
+    return j['data']['live_status']
+
+class LiveWatcher():
+    """
+    给同步代码(old.py)用：后台线程里跑一个只解析LIVE/PREPARING的弹幕连接，
+    加上低频HTTP兜底，状态在self.status里。
+    弹幕连接是匿名的(uid为0，getDanmuInfo不带cookie)，只用来收开播下播通知，不算账号在观看。
+    """
+    def __init__(self, room_id, poll_interval=300) -> None:
+        self.room_id = room_id
+        self.poll_interval = poll_interval
+        self.status = LiveStatus(room_id)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(),), name='LiveWatcher', daemon=True)
+        self.thread.start()
+        return self
+
+    async def run(self):
+        import aiohttp
+        from dulunche.dmc import DanmakuClient
+        from dulunche.ingest import IngestQueue
+        # 其他消息没人看，队列满了直接丢
+        q = IngestQueue(maxsize=16, policy='drop_oldest')
+        async with aiohttp.ClientSession() as session:
+            poller = asyncio.create_task(self.status.poll(lambda: get_live_status(self.room_id, session), self.poll_interval))
+            try:
+                while True:
+                    dmc = DanmakuClient(
+                        url=f'https://live.bilibili.com/{self.room_id}',
+                        q=q,
+                        cmds=frozenset(['LIVE', 'PREPARING']),
+                        session=session,
+                        live=self.status,
+                    )
+                    try:
+                        await dmc.start()
+                    except Exception as e:
+                        logging.error(f'[房间 {self.room_id}] 弹幕连接出错: {e}')
+                        await asyncio.sleep(5)
+                    finally:
+                        await dmc.stop()
+            finally:
+                poller.cancel()
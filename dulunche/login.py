@@ -1,15 +1,10 @@
 # -*- coding: utf-8 -*-
-import qrcode
 from threading import Thread
 import time
-import requests
 from io import BytesIO
 import http.cookiejar as cookielib
-from PIL import Image
 import os
 
-requests.packages.urllib3.disable_warnings()
-
 headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.5005.63 Safari/537.36 Edg/102.0.1245.30",'Referer': "https://www.bilibili.com/"}
 headerss = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.5005.63 Safari/537.36 Edg/102.0.1245.30",'Host': 'passport.bilibili.com','Referer': "https://passport.bilibili.com/login"}
 
@@ -19,6 +14,7 @@ class showpng(Thread):
         self.data = data
 
     def run(self):
+        from PIL import Image
         img = Image.open(BytesIO(self.data)).resize((512,512))
         print('请打开文件QRcode.png扫码.')
         img.save('QRcode.png')
@@ -40,6 +36,10 @@ def islogin(session):
 
 
 def bzlogin(cookies):
+    # 扫码登录才用到的依赖，导入本模块时不加载
+    import qrcode
+    import requests
+    requests.packages.urllib3.disable_warnings()
     if not os.path.exists(cookies):
         with open(cookies, 'w') as f:
             f.write("")
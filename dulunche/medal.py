@@ -0,0 +1,71 @@
+"""
+粉丝牌亲密度跟踪：定时调用getInfoByUser，亲密度变化时写日志，不需要浏览器。
+开播下播由dulunche.live.LiveStatus提供，未开播时不查询。
+"""
+import logging
+import threading
+
+__all__ = ["MedalTracker", "parse_medal"]
+
+def parse_medal(data):
+    """从getInfoByUser的data里取出当前佩戴的粉丝牌：(名称, 等级, 亲密度)，没戴返回None"""
+    medal_info = data.get('medal') or {}
+    if not medal_info.get('is_weared'):
+        return None
+    curr = medal_info.get('curr_weared_v2') or medal_info.get('curr_weared')
+    if not curr:
+        return None
+    name = curr.get('medal_name') or curr.get('name', '')
+    level = curr.get('level', '')
+    intimacy = curr.get('intimacy')
+    if intimacy is None:
+        return None
+    if curr.get('next_intimacy'):
+        intimacy = f"{intimacy}/{curr['next_intimacy']}"
+    return name, level, str(intimacy)
+
+class MedalTracker():
+    """
+    fetch: 返回getInfoByUser结果的函数，如 lambda: bapi.get_user_info(room_id)
+    status: dulunche.live.LiveStatus，不传则一直查询
+    """
+    def __init__(self, room_id, fetch, interval=60, status=None) -> None:
+        self.room_id = room_id
+        self.fetch = fetch
+        self.interval = interval
+        self.status = status
+        self.last_value = None
+        self.thread = None
+        self.__stop = threading.Event()
+
+    def check(self):
+        """查询一次，亲密度变化时写日志，返回当前粉丝牌信息"""
+        res = self.fetch()
+        if res.get('code') != 0:
+            raise RuntimeError(res.get('message') or res.get('msg'))
+        medal = parse_medal(res['data'])
+        if medal is None:
+            logging.warning(f"[房间 {self.room_id}] 未找到粉丝牌或亲密度信息")
+            return None
+        name, level, intimacy = medal
+        if intimacy != self.last_value:
+            logging.info(f"[房间 {self.room_id}] [{name} Lv{level}] 亲密度变化: {self.last_value} → {intimacy}")
+            self.last_value = intimacy
+        return medal
+
+    def run(self):
+        while not self.__stop.wait(self.interval):
+            if self.status is not None and self.status.live is False:
+                continue
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"[房间 {self.room_id}] 获取亲密度失败: {e}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='MedalTracker', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.__stop.set()
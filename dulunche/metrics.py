@@ -0,0 +1,168 @@
+"""
+Prometheus文本格式的运行指标。
+
+计数器和直方图都是预先创建好的对象，热路径上只有整数/浮点加法；
+队列长度、窗口大小这类指标用回调在抓取时才计算，平时没有开销。
+每秒帧数/包数请在Prometheus里用rate(dulunche_frames_total[1m])计算。
+"""
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+
+from dulunche.filters import DanmakuFilter
+
+__all__ = ["Counter", "Gauge", "Histogram", "PipelineMetrics"]
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}'
+
+class Counter():
+    type = 'counter'
+
+    def __init__(self, name, help, labels=None) -> None:
+        self.name = name
+        self.help = help
+        self.labels = format_labels(labels)
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self):
+        yield self.name + self.labels, self.value
+
+class Gauge():
+    type = 'gauge'
+
+    def __init__(self, name, help, fn=None, labels=None) -> None:
+        self.name = name
+        self.help = help
+        self.labels = format_labels(labels)
+        self.fn = fn
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        yield self.name + self.labels, self.fn() if self.fn is not None else self.value
+
+class Histogram():
+    type = 'histogram'
+    default_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self, name, help, buckets=default_buckets) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = list(buckets)
+        # 最后一格是+Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        acc = 0
+        for le, n in zip(self.buckets, self.counts):
+            acc += n
+            yield f'{self.name}_bucket{{le="{le}"}}', acc
+        yield f'{self.name}_bucket{{le="+Inf"}}', self.count
+        yield f'{self.name}_sum', self.sum
+        yield f'{self.name}_count', self.count
+
+class PipelineMetrics():
+    """
+    接收链路的指标：DanmakuClient -> IngestQueue -> 过滤 -> DanmakuList。
+    过滤计数包括解码时就被DanmakuFilter丢弃的弹幕。
+    队列丢弃/合并计数由IngestQueue(metrics=...)累加；队列长度、窗口和速率估计在创建后通过bind_queue()/bind_window()/bind_rate()接入。
+    """
+    filter_reasons = DanmakuFilter.reasons
+
+    def __init__(self) -> None:
+        self.frames = Counter('dulunche_frames_total', 'websocket frames received')
+        self.packets = Counter('dulunche_packets_total', 'messages decoded from frames')
+        self.decode_seconds = Histogram('dulunche_decode_seconds', 'per-frame decode latency, arrival to parsed')
+        self.reconnects = Counter('dulunche_reconnects_total', 'websocket reconnects')
+        self.reconnect_gap = Gauge('dulunche_reconnect_gap_seconds', 'duration of the last disconnect')
+        self.accepted = Counter('dulunche_filter_total', 'danmaku filter decisions', labels={'result': 'accept', 'reason': ''})
+        self.rejected = {
+            reason: Counter('dulunche_filter_total', 'danmaku filter decisions', labels={'result': 'reject', 'reason': reason})
+            for reason in self.filter_reasons
+        }
+        self.last_frame = None
+        self.last_message_age = Gauge('dulunche_last_message_age_seconds', 'seconds since the last frame', fn=self.message_age)
+        self.queue_depth = Gauge('dulunche_queue_depth', 'messages waiting in the ingest queue')
+        self.queue_dropped = Counter('dulunche_queue_dropped_total', 'messages dropped by the ingest queue')
+        self.queue_coalesced = Counter('dulunche_queue_coalesced_total', 'messages coalesced by the ingest queue')
+        self.window_size = Gauge('dulunche_window_size', 'danmaku in the DanmakuList window')
+        self.window_distinct = Gauge('dulunche_window_distinct', 'distinct contents in the DanmakuList window')
+        self.rates = []
+
+    def message_age(self):
+        if self.last_frame is None:
+            return float('nan')
+        return time.monotonic() - self.last_frame
+
+    def bind_queue(self, q):
+        self.queue_depth.fn = q.qsize
+
+    def bind_window(self, dmlist):
+        self.window_size.fn = lambda: len(dmlist)
+        self.window_distinct.fn = lambda: len(dmlist.counters['all'])
+
+    def bind_rate(self, rate):
+        self.rates = []
+        for view in (*rate.views, 'ewma'):
+            name = view if view == 'ewma' else f'{view}s'
+            self.rates.append(Gauge(f'dulunche_rate_{name}', f'accepted danmaku per second ({name})',
+                                    fn=lambda view=view: rate.get(view)))
+
+    def metrics(self):
+        return [
+            self.frames, self.packets, self.decode_seconds, self.reconnects, self.reconnect_gap,
+            self.accepted, *self.rejected.values(), self.last_message_age,
+            self.queue_depth, self.queue_dropped, self.queue_coalesced,
+            self.window_size, self.window_distinct, *self.rates,
+        ]
+
+    def render(self) -> str:
+        lines = []
+        seen = set()
+        for m in self.metrics():
+            if m.name not in seen:
+                seen.add(m.name)
+                lines.append(f'# HELP {m.name} {m.help}')
+                lines.append(f'# TYPE {m.name} {m.type}')
+            for name, value in m.samples():
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            # 读掉请求头
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if request.split(b' ')[1:2] == [b'/metrics']:
+                body = self.render().encode('utf-8')
+                head = 'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+            else:
+                body = b'not found\n'
+                head = 'HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n'
+            writer.write(f'{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('ascii') + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, port, host='127.0.0.1'):
+        server = await asyncio.start_server(self.handle, host, port)
+        logging.info(f'运行指标: http://{host}:{port}/metrics')
+        async with server:
+            await server.serve_forever()
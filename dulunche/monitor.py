@@ -0,0 +1,127 @@
+"""
+多直播间只读监控：所有房间跑在同一个事件循环上，HTTP请求共用一个带连接池的aiohttp会话，
+websocket另用一个不限连接数的会话（每个房间的连接一直占着名额，不能挤占HTTP的连接池），
+每个房间有自己的DanmakuList和统计，不发送任何弹幕。
+"""
+import asyncio
+import logging
+from collections import Counter
+
+import aiohttp
+
+from dulunche.danmaku import Danmaku, DanmakuList
+from dulunche.dmc import DanmakuClient, Bilibili
+from dulunche.ingest import IngestQueue
+from dulunche.archive import DanmakuArchive
+from dulunche.emoticon import emoticons
+
+class RoomMonitor():
+    def __init__(self, room_id, session, duration=60, cmds=Bilibili.danmaku_cmds, queue_size=10000, archive=None, ws_session=None) -> None:
+        self.room_id = room_id
+        self.archive = archive
+        self.session = session
+        self.ws_session = ws_session
+        self.cmds = cmds
+        self.q = IngestQueue(maxsize=queue_size, policy='coalesce')
+        self.dmlist = DanmakuList(duration=duration, threadsafe=False)
+        self.stats = Counter()
+        self.dmc = None
+        self.stoped = False
+
+    async def connect(self):
+        """断线或出错后重新建立DanmakuClient，直到stop()"""
+        while not self.stoped:
+            self.dmc = DanmakuClient(
+                url=f'https://live.bilibili.com/{self.room_id}',
+                q=self.q,
+                cmds=self.cmds,
+                session=self.session,
+                ws_session=self.ws_session,
+            )
+            try:
+                await self.dmc.start()
+            except asyncio.CancelledError:
+                await self.dmc.stop()
+                raise
+            except Exception as e:
+                await self.dmc.stop()
+                self.stats['errors'] += 1
+                logging.error(f'[{self.room_id}] {e}')
+                await asyncio.sleep(5)
+
+    async def consume(self):
+        while not self.stoped:
+            for dm in await self.q.get_many():
+                repeat = dm.get('repeat', 1)
+                self.stats[dm['msg_type']] += repeat
+                if dm['msg_type'] in ['danmaku', 'emoticon']:
+                    if self.archive is not None:
+                        for _ in range(repeat):
+                            self.archive.add_msg(self.room_id, dm)
+                    dm = Danmaku(
+                        dmid=0,
+                        dmtype=dm['msg_type'],
+                        streamer=self.room_id,
+                        sender=dm['name'],
+                        stime=dm['time'],
+                        content=dm['content'],
+                        color=dm['color']
+                    )
+                    for _ in range(repeat):
+                        self.dmlist.add(dm)
+
+    async def run(self):
+        await asyncio.gather(self.connect(), self.consume())
+
+    async def stop(self):
+        self.stoped = True
+        if self.dmc is not None:
+            await self.dmc.stop()
+
+    def report(self, top=3):
+        num = len(self.dmlist)
+        top_danmu = ' | '.join(f'{emoticons.describe(dm.content) if dm.dmtype == "emoticon" else dm.content}x{cnt}' for dm, cnt in self.dmlist.count(top=top))
+        res = f'[{self.room_id}] {num/self.dmlist.duration:.2f}条/秒，累计弹幕 {self.stats["danmaku"]+self.stats["emoticon"]} 条，热门：{top_danmu}'
+        if self.q.dropped or self.q.coalesced:
+            res += f'，队列丢弃 {self.q.dropped} 条，合并 {self.q.coalesced} 条'
+        return res
+
+class MultiRoomMonitor():
+    def __init__(self, room_ids, duration=60, report_interval=30, limit=100, limit_per_host=20, ws_limit=0, archive=None) -> None:
+        """
+        limit/limit_per_host: HTTP请求(room_init、getDanmuInfo)的连接池大小
+        ws_limit: websocket连接数上限，0表示不限制；每个房间一直占着一个连接，不能和HTTP共用连接池
+        archive: SQLite存档路径，所有房间共用一个后台写入线程
+        """
+        self.room_ids = room_ids
+        self.archive = archive
+        self.duration = duration
+        self.report_interval = report_interval
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ws_limit = ws_limit
+        self.rooms = {}
+
+    async def reporter(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            for room in self.rooms.values():
+                logging.info(room.report())
+
+    async def run(self):
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+        ws_connector = aiohttp.TCPConnector(limit=self.ws_limit, limit_per_host=0)
+        archive = DanmakuArchive(self.archive).start() if self.archive else None
+        async with aiohttp.ClientSession(connector=connector) as session, aiohttp.ClientSession(connector=ws_connector) as ws_session:
+            self.rooms = {rid: RoomMonitor(rid, session, self.duration, archive=archive, ws_session=ws_session) for rid in self.room_ids}
+            tasks = [asyncio.create_task(room.run()) for room in self.rooms.values()]
+            tasks.append(asyncio.create_task(self.reporter()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                for room in self.rooms.values():
+                    await room.stop()
+                if archive is not None:
+                    archive.close()
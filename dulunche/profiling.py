@@ -0,0 +1,125 @@
+"""
+运行中按需分析性能，不用重启、不丢弹幕窗口。默认关闭，关闭时没有任何开销。
+
+    kill -USR1 <pid>   开始cProfile和分阶段计时；再发一次停止，统计写入profile_dir/*.prof
+    kill -USR2 <pid>   第一次开始tracemalloc，之后每次拍快照，输出与上一次相比增长最多的分配位置
+
+分阶段计时通过临时替换目标函数实现，只在cProfile开启期间生效。
+Windows没有SIGUSR1/SIGUSR2，不支持信号触发。
+"""
+import os
+import time
+import signal
+import cProfile
+import pstats
+import logging
+import functools
+import tracemalloc
+from io import StringIO
+from datetime import datetime
+
+__all__ = ["Profiler"]
+
+class StageTimer():
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __str__(self) -> str:
+        avg = self.total / self.count if self.count else 0.0
+        return f'{self.count}次，总计 {self.total:.3f}s，平均 {avg*1e6:.1f}us，最大 {self.max*1e3:.2f}ms'
+
+def timed(fn, stat):
+    perf_counter = time.perf_counter
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            dt = perf_counter() - t0
+            stat.count += 1
+            stat.total += dt
+            if dt > stat.max:
+                stat.max = dt
+    return wrapper
+
+class Profiler():
+    def __init__(self, out_dir='profile', stages=()) -> None:
+        """
+        stages: [(阶段名, 对象, 属性名), ...]，分析期间把对象上的这个函数换成计时版本
+        """
+        self.out_dir = out_dir
+        self.stages = list(stages)
+        self.profile = None
+        self.timers = {}
+        self.patched = []
+        self.snapshot = None
+
+    def install(self, loop):
+        if not hasattr(signal, 'SIGUSR1'):
+            logging.warning('当前系统不支持SIGUSR1/SIGUSR2，性能分析不可用.')
+            return False
+        loop.add_signal_handler(signal.SIGUSR1, self.toggle_profile)
+        loop.add_signal_handler(signal.SIGUSR2, self.memory_snapshot)
+        logging.info(f'性能分析已就绪：kill -USR1 {os.getpid()} 开始/停止cProfile，kill -USR2 {os.getpid()} 内存快照.')
+        return True
+
+    def path(self, suffix):
+        os.makedirs(self.out_dir, exist_ok=True)
+        return os.path.join(self.out_dir, datetime.now().strftime('%Y%m%d-%H%M%S') + suffix)
+
+    def patch_stages(self):
+        self.timers = {}
+        for name, owner, attr in self.stages:
+            had = attr in vars(owner)
+            orig = getattr(owner, attr)
+            stat = self.timers.setdefault(name, StageTimer())
+            setattr(owner, attr, timed(orig, stat))
+            self.patched.append((owner, attr, had, orig))
+
+    def unpatch_stages(self):
+        for owner, attr, had, orig in reversed(self.patched):
+            if had:
+                setattr(owner, attr, orig)
+            else:
+                delattr(owner, attr)
+        self.patched = []
+
+    def toggle_profile(self):
+        if self.profile is None:
+            self.patch_stages()
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            logging.info('cProfile已开始.')
+            return
+        self.profile.disable()
+        self.unpatch_stages()
+        path = self.path('.prof')
+        self.profile.dump_stats(path)
+        out = StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(15)
+        self.profile = None
+        logging.info(f'cProfile已停止，统计已保存到 {path}\n{out.getvalue()}')
+        for name, stat in self.timers.items():
+            logging.info(f'阶段 {name}: {stat}')
+
+    def memory_snapshot(self, top=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.snapshot = tracemalloc.take_snapshot()
+            logging.info('tracemalloc已开始，再次触发时输出内存增长.')
+            return
+        snapshot = tracemalloc.take_snapshot()
+        path = self.path('.tracemalloc')
+        snapshot.dump(path)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f'内存快照已保存到 {path}，当前 {current/2**20:.1f}MB，峰值 {peak/2**20:.1f}MB，增长最多的分配：']
+        for stat in snapshot.compare_to(self.snapshot, 'lineno')[:top]:
+            lines.append(str(stat))
+        logging.info('\n'.join(lines))
+        self.snapshot = snapshot
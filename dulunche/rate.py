@@ -0,0 +1,82 @@
+"""
+弹幕速率估计：按秒分桶的环形缓冲，记录O(1)，任意窗口的速率查询也是O(1)。
+
+环里存的是每一秒结束时的累计条数，窗口内条数就是两个累计值相减，
+不需要保存弹幕本身，也不用拿DanmakuList的锁。
+"""
+import time
+
+__all__ = ["RateEstimator"]
+
+class RateEstimator():
+    # 常用的几个视图，单位秒
+    views = (1, 10, 60, 300)
+
+    def __init__(self, horizon=300, halflife=10, clock=time.monotonic) -> None:
+        # 多留一格，窗口取满horizon时也能拿到起点的累计值
+        self.size = int(horizon) + 1
+        self.clock = clock
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.cum = [0] * self.size
+        self.total = 0
+        self.start = self.sec = int(clock())
+        # 上一个完整秒结束时的累计值
+        self.last = 0
+        self.ewma = 0.0
+
+    def advance(self, sec):
+        """把self.sec到sec之前的秒结算进环里，最多循环size次"""
+        gap = sec - self.sec
+        if gap <= 0:
+            return
+        count = self.total - self.last
+        self.ewma += self.alpha * (count - self.ewma)
+        self.ewma *= (1 - self.alpha) ** (gap - 1)
+        for s in range(max(self.sec, sec - self.size), sec):
+            self.cum[s % self.size] = self.total
+        self.last = self.total
+        self.sec = sec
+
+    def add(self, n=1):
+        sec = int(self.clock())
+        if sec != self.sec:
+            self.advance(sec)
+        self.total += n
+
+    def cumulative(self, s):
+        """第s秒结束时的累计条数，s必须在环的范围内"""
+        if s >= self.sec:
+            return self.total
+        if s < self.start:
+            return 0
+        return self.cum[s % self.size]
+
+    def rate(self, window=60):
+        """最近window个完整秒的平均速率，条/秒；不足window秒按实际时长算"""
+        now = int(self.clock())
+        window = max(1, min(int(window), self.size - 1))
+        span = max(1, min(window, now - self.start))
+        return (self.cumulative(now - 1) - self.cumulative(now - 1 - window)) / span
+
+    def ewma_rate(self):
+        """按秒指数加权的速率，半衰期为halflife秒"""
+        now = int(self.clock())
+        gap = now - self.sec
+        if gap <= 0:
+            return self.ewma
+        ewma = self.ewma + self.alpha * (self.total - self.last - self.ewma)
+        return ewma * (1 - self.alpha) ** (gap - 1)
+
+    def get(self, view):
+        """view为秒数或'ewma'"""
+        if view == 'ewma':
+            return self.ewma_rate()
+        return self.rate(view)
+
+    def snapshot(self):
+        rates = {f'{w}s': self.rate(w) for w in self.views if w < self.size}
+        rates['ewma'] = self.ewma_rate()
+        return rates
+
+    def __str__(self) -> str:
+        return ' '.join(f'{k}:{v:.2f}' for k, v in self.snapshot().items()) + ' 条/秒'
@@ -0,0 +1,185 @@
+"""
+原始websocket帧的录制与回放。
+
+录制文件格式：8字节文件头MAGIC，之后每帧为
+    <接收时间戳 float64 (time.time())> <长度 uint32> <帧数据>
+帧数据保持收到时的样子（仍是压缩的），只追加写入。
+
+    python -m dulunche.record record 23197314 room.rec
+    python -m dulunche.record replay room.rec --speed 10
+"""
+import os
+import mmap
+import time
+import asyncio
+import logging
+from struct import Struct
+from datetime import datetime
+
+from dulunche.dmc import Bilibili, PacketDecoder
+
+MAGIC = b'DLCREC1\n'
+RECORD = Struct('<dI')
+
+class FrameRecorder():
+    def __init__(self, path, buffering=1<<16) -> None:
+        self.path = path
+        self.f = open(path, 'ab', buffering=buffering)
+        if self.f.tell() == 0:
+            self.f.write(MAGIC)
+        self.frames = 0
+
+    def write(self, data, ts=None):
+        if ts is None:
+            ts = time.time()
+        self.f.write(RECORD.pack(ts, len(data)))
+        self.f.write(data)
+        self.frames += 1
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_frames(path, use_mmap=True):
+    """
+    按顺序产出(ts, data)。use_mmap时通过内存映射读取，不会把整个文件读进内存。
+    文件末尾写了一半的帧会被忽略。
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} 不是弹幕录制文件')
+        if not use_mmap:
+            while True:
+                head = f.read(RECORD.size)
+                if len(head) < RECORD.size:
+                    return
+                ts, length = RECORD.unpack(head)
+                data = f.read(length)
+                if len(data) < length:
+                    return
+                yield ts, data
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = len(MAGIC)
+            end = len(mm)
+            while offset + RECORD.size <= end:
+                ts, length = RECORD.unpack_from(mm, offset)
+                offset += RECORD.size
+                if offset + length > end:
+                    return
+                yield ts, mm[offset:offset+length]
+                offset += length
+
+class FrameReplayer():
+    """
+    把录制文件按原始节奏解码后送进队列，用法与DanmakuClient相同。
+    speed: 1为原速，N为N倍速，0为不等待全速回放
+    """
+    def __init__(self, path, q, speed=1.0, cmds=None, use_mmap=True) -> None:
+        self.path = path
+        self.q = q
+        self.speed = speed
+        self.cmds = cmds
+        self.use_mmap = use_mmap
+        self.frames = 0
+        # 当前回放到的录制时间，可作为DanmakuList的clock
+        self.now = 0.0
+        self.__stop = False
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        decoder = PacketDecoder()
+        t_start = loop.time()
+        ts0 = None
+        for ts, data in iter_frames(self.path, self.use_mmap):
+            if self.__stop:
+                break
+            if ts0 is None:
+                ts0 = ts
+            if self.speed:
+                delay = (ts - ts0) / self.speed - (loop.time() - t_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.frames % 64 == 0:
+                await asyncio.sleep(0)
+            self.frames += 1
+            self.now = ts
+            for m in Bilibili.decode_msg(data, decoder, self.cmds):
+                if not m.get('time',0):
+                    m['time'] = datetime.fromtimestamp(ts)
+                await self.q.put(m)
+
+    async def stop(self):
+        self.__stop = True
+
+async def record(room_id, path):
+    from dulunche.dmc import DanmakuClient
+    q = asyncio.Queue()
+    with FrameRecorder(path) as recorder:
+        dmc = DanmakuClient(url=f'https://live.bilibili.com/{room_id}', q=q, cmds=(), recorder=recorder)
+        task = asyncio.create_task(dmc.start())
+        try:
+            while True:
+                await asyncio.sleep(10)
+                while not q.empty():
+                    q.get_nowait()
+                recorder.flush()
+                logging.info(f'已录制 {recorder.frames} 帧')
+        finally:
+            task.cancel()
+            await dmc.stop()
+
+async def replay(path, speed, duration, top):
+    from dulunche.danmaku import Danmaku, DanmakuList
+    q = asyncio.Queue(maxsize=1024)
+    replayer = FrameReplayer(path, q, speed=speed, cmds=Bilibili.danmaku_cmds)
+    dmlist = DanmakuList(duration=duration, clock=lambda: replayer.now)
+    task = asyncio.create_task(replayer.start())
+    n = 0
+    t0 = time.perf_counter()
+    while not (task.done() and q.empty()):
+        try:
+            dm = await asyncio.wait_for(q.get(), 1)
+        except asyncio.TimeoutError:
+            continue
+        if dm['msg_type'] not in ['danmaku', 'emoticon']:
+            continue
+        n += 1
+        dmlist.add(Danmaku(0, dm['msg_type'], None, dm['name'], dm['time'], dm['content'], dm['color']))
+    task.result()
+    logging.info(f'回放 {replayer.frames} 帧，{n} 条弹幕，用时 {time.perf_counter()-t0:.2f}s')
+    for dm, cnt in dmlist.count(top=top):
+        logging.info(f'{cnt:5d} {dm.content}')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('record')
+    p.add_argument('room_id')
+    p.add_argument('path')
+    p = sub.add_parser('replay')
+    p.add_argument('path')
+    p.add_argument('-s','--speed',type=float,default=0,help='回放倍速，0为全速')
+    p.add_argument('-d','--duration',type=float,default=30,help='DanmakuList窗口长度')
+    p.add_argument('-n','--top',type=int,default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s]: %(message)s",
+        datefmt='%Y-%m-%d %H:%M:%S',
+    )
+    if args.cmd == 'record':
+        asyncio.run(record(args.room_id, args.path))
+    else:
+        asyncio.run(replay(args.path, args.speed, args.duration, args.top))
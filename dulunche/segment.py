@@ -0,0 +1,145 @@
+"""
+old.py的文本切分：流式读文件，逐行产出弹幕，不把整本书读进内存。
+
+独轮车模式每行一条（截到30字）；说书模式按标点切句，短句合并、长句拆开。
+读到单独一行的//为止。auto模式看最长的一行是否超过40字符（含换行符）来判断。
+切好的结果按文件内容哈希和切分参数缓存在磁盘上，同一本书再次启动直接读缓存。
+"""
+import os
+import re
+import json
+import logging
+from hashlib import blake2b
+
+__all__ = ["segment", "detect_mode", "load_text"]
+
+# 缓存格式或切分规则变化时加一，旧缓存自动失效
+VERSION = 1
+SEPARATORS = re.compile(r"[,，.。～！、;；]")
+# 超过这个长度（含换行符）的行说明是书
+BOOK_LINE = 40
+MAX_LEN = 30
+MERGE_LEN = 25
+SHORT_LEN = 10
+
+def iter_lines(fpath):
+    with open(fpath, 'r', encoding='utf-8') as f:
+        yield from f
+
+def scan(fpath):
+    """一遍读完：返回(内容哈希, 最长一行的长度)"""
+    h = blake2b(digest_size=16)
+    longest = 0
+    for line in iter_lines(fpath):
+        h.update(line.encode('utf-8'))
+        if len(line) > longest:
+            longest = len(line)
+    return h.hexdigest(), longest
+
+def detect_mode(longest):
+    return '说书' if longest > BOOK_LINE else '独轮车'
+
+def segment_dulunche(lines):
+    for t in lines:
+        t = t.strip()
+        if len(t) > 0 and not t.startswith('//'):
+            yield t[:MAX_LEN]
+        if t == '//':
+            break
+
+def segment_shuoshu(lines):
+    for line in lines:
+        line = line.strip()
+        if line == '//':
+            break
+        str_list = [s for s in SEPARATORS.split(line) if s and len(s.strip())>0]
+        p = 0
+        while p < len(str_list):
+            t = str_list[p]
+            if len(t) < SHORT_LEN:
+                # 短句和后面的句子合并，合并后不超过MERGE_LEN
+                while p < len(str_list)-1 and len(t+' '+str_list[p+1]) < MERGE_LEN:
+                    t += ' '+str_list[p+1]
+                    p += 1
+                yield t
+            elif len(t) > MAX_LEN:
+                if len(t) < 2*MAX_LEN:
+                    yield t[:len(t)//2]
+                    yield t[len(t)//2:]
+                else:
+                    # 超过60字只取前60字
+                    yield t[0:MAX_LEN]
+                    yield t[MAX_LEN:2*MAX_LEN]
+            else:
+                yield t
+            p += 1
+
+def segment(fpath, mode):
+    """按mode流式切分文件，mode里含“独轮车”时按行，否则按说书规则"""
+    if '独轮车' in mode:
+        return segment_dulunche(iter_lines(fpath))
+    return segment_shuoshu(iter_lines(fpath))
+
+def cache_path(cache_dir, digest, mode):
+    key = blake2b(json.dumps([VERSION, digest, mode, MAX_LEN, MERGE_LEN, SHORT_LEN, SEPARATORS.pattern]).encode(), digest_size=16)
+    return os.path.join(cache_dir, f'{key.hexdigest()}.txt')
+
+def cached_scan(fpath, cache_dir):
+    """
+    scan()的结果按(路径, 大小, 修改时间)记在cache_dir/index.json里，
+    文件没动过就不用再读一遍算哈希。
+    """
+    index_path = os.path.join(cache_dir, 'index.json')
+    st = os.stat(fpath)
+    key = os.path.abspath(fpath)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(key)
+    if entry is not None and entry[:2] == [st.st_size, st.st_mtime_ns]:
+        return entry[2], entry[3]
+    digest, longest = scan(fpath)
+    index[key] = [st.st_size, st.st_mtime_ns, digest, longest]
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, index_path)
+    except OSError as e:
+        logging.warning(f'文本切分缓存写入失败: {e}')
+    return digest, longest
+
+def load_text(fpath, mode='auto', cache_dir='.segcache'):
+    """
+    返回(mode, 弹幕列表)。mode为auto时自动判断，判断和计算缓存用的哈希在同一遍里完成。
+    cache_dir为None时不使用缓存。
+    """
+    if cache_dir is None:
+        digest, longest = scan(fpath)
+    else:
+        digest, longest = cached_scan(fpath, cache_dir)
+    if mode == 'auto':
+        mode = detect_mode(longest)
+    if cache_dir is None:
+        return mode, list(segment(fpath, mode))
+    path = cache_path(cache_dir, digest, mode)
+    # 每行一条；弹幕里不会有换行符，按\n分行就能原样读回
+    try:
+        with open(path, 'r', encoding='utf-8', newline='\n') as f:
+            return mode, [line[:-1] for line in f]
+    except (OSError, ValueError):
+        pass
+    text = list(segment(fpath, mode))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再改名，中途退出不会留下半个缓存
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+            f.writelines(t + '\n' for t in text)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning(f'文本切分缓存写入失败: {e}')
+    return mode, text
@@ -1,11 +1,16 @@
 import argparse
-import yaml
 import logging
-from dulunche import AutoDuLunChe
+from dulunche import check_env
 
 if __name__ == '__main__':
+    # 双击启动时缺依赖直接提示安装；只查找模块，不会导入
+    check_env.check()
+    import yaml
+    from dulunche import AutoDuLunChe
+
     parser = argparse.ArgumentParser()
     parser.add_argument('-c','--config',type=str,default='./config.yml')
+    parser.add_argument('--profile',action='store_true',help='开启信号触发的性能分析(SIGUSR1: cProfile, SIGUSR2: 内存快照)')
     args = parser.parse_args()
     
     logging.basicConfig(
@@ -16,6 +21,8 @@ if __name__ == '__main__':
 
     with open(args.config,'r',encoding='utf-8') as f:
         config = yaml.safe_load(f)
+    if args.profile:
+        config['profiling'] = True
     
     dlc = AutoDuLunChe(**config)
     dlc.start()
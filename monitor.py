@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+import logging
+from dulunche.monitor import MultiRoomMonitor
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='多直播间弹幕只读监控，不发送弹幕')
+    parser.add_argument('rooms',type=str,nargs='+',help='B站房间号')
+    parser.add_argument('-d','--duration',type=float,default=60,help='统计窗口长度(秒)')
+    parser.add_argument('-i','--interval',type=float,default=30,help='输出统计的间隔(秒)')
+    parser.add_argument('--limit',type=int,default=100,help='HTTP连接池大小')
+    parser.add_argument('--limit-per-host',type=int,default=20,help='HTTP连接池里每个域名的连接数')
+    parser.add_argument('--ws-limit',type=int,default=0,help='websocket连接数上限，0表示不限制（每个房间一个）')
+    parser.add_argument('--archive',type=str,default=None,help='把弹幕存档到这个SQLite文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s]: %(message)s",
+        datefmt='%Y-%m-%d %H:%M:%S',
+    )
+
+    monitor = MultiRoomMonitor(args.rooms, duration=args.duration, report_interval=args.interval, limit=args.limit, limit_per_host=args.limit_per_host, ws_limit=args.ws_limit, archive=args.archive)
+    try:
+        asyncio.run(monitor.run())
+    except KeyboardInterrupt:
+        pass